@@ -1,2 +1,3 @@
 from pen_plots.stroke_opt import optimize_stroke_order
 from pen_plots.gcode import write_gcode
+from pen_plots.simulation import estimate_plot_time, estimate_gcode_time
@@ -1 +1,2 @@
 from pen_plots.fonts.glyph import Glyph, glyphs_to_strokes, transform_glyph, combine_glyphs
+from pen_plots.fonts.metrics import glyph_metrics, measure_glyphs, break_glyphs, measure_text, wrap_text
@@ -1,31 +1,44 @@
 import numpy as np
 from collections import namedtuple
-from pen_plots.strokes import affine_transformation, bounding_box, translate, scale
+from pen_plots.strokes import affine_transformation, bounding_box, scale, StrokeBuffer, StrokeGroup
 
 # A glyph consists of a list of lines as well as horizontal margins.
 Glyph = namedtuple("Glyph", ["lines", "left", "right"])
 
 
-def glyphs_to_strokes(glyphs, font_size=21, alignment='left'):
+def glyphs_to_strokes(glyphs, font_size=21, alignment='left', lazy=False):
     """
     Converts a list of glyphs to strokes. Glyphs are placed from left to right, spaced according to their margins.
 
     This can be considered as rendering a single line of text without line breaks.
+
+    If `lazy` is set, a StrokeGroup is returned, which defers scaling as well as any further transformations until
+    its points are needed.
     """
-    offset = 0
-    strokes = []
-    for glyph in glyphs:
-        strokes.extend(translate(glyph.lines, offset - glyph.left, 0))
-        offset += glyph.right - glyph.left
+    lines = [line for glyph in glyphs for line in glyph.lines]
+    if len(lines) == 0:
+        return StrokeGroup([]) if lazy else []
+
+    # Horizontal position of each glyph
+    advance = np.array([glyph.right - glyph.left for glyph in glyphs], dtype=float)
+    offset = np.concatenate([[0], np.cumsum(advance)])
+    glyph_offset = offset[:-1] - [glyph.left for glyph in glyphs]
 
     if alignment == 'left':  # Align left-most point to lie of y-axis
         pass
     elif alignment == 'right':  # Align right-most point to lie of y-axis
-        strokes = translate(strokes, -offset, 0)
+        glyph_offset -= offset[-1]
     elif alignment == 'center':  # Align center point to lie on y-axis
-        strokes = translate(strokes, -offset / 2, 0)
+        glyph_offset -= offset[-1] / 2
+
+    # Place all glyphs at once on the packed points of all lines
+    coords = np.concatenate(lines, axis=0).astype(float)
+    line_offset = np.repeat(glyph_offset, [len(glyph.lines) for glyph in glyphs])
+    coords[:, 0] += np.repeat(line_offset, [len(line) for line in lines])
+    offsets = np.concatenate([[0], np.cumsum([len(line) for line in lines])])
 
-    return scale(strokes, 25.4 / 72 * font_size / 21)
+    strokes = StrokeGroup(StrokeBuffer(coords, offsets)) if lazy else np.split(coords, offsets[1:-1])
+    return scale(strokes, 25.4 / 72 * font_size / 21, inplace=True)
 
 
 def combine_glyphs(*glyphs):
@@ -1 +1 @@
-from pen_plots.fonts.hershey.hershey import glyph_by_char, glyph_by_hershey_code
+from pen_plots.fonts.hershey.hershey import glyph_by_char, glyph_by_hershey_code, metrics_by_char
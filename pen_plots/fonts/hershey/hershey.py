@@ -1,39 +1,106 @@
 import numpy as np
-import json
-import yaml
+import os
+import tempfile
 from pathlib import Path
 from pen_plots.fonts import Glyph
+from pen_plots.fonts.metrics import ink_extents
 
-# Load glyphs
-with open(Path(__file__).parent / "hershey-occidental.json", "r") as read_file:
-    glyphs_by_hershey_code = {
-        glyph['charcode']: Glyph(
-            lines=[np.array(l) * [1, -1] for l in glyph["lines"]],  # Flip y-axis
-            left=glyph["left"],
-            right=glyph["right"],
-        )
-        for glyph in json.load(read_file)
-    }
-    # Add space glyphs.
-    for hershey_code in [699, 2199, 2699, 2749, 3199, 3699]:
-        glyphs_by_hershey_code[hershey_code] = Glyph(
-            lines=[],
-            left=-5,
-            right=5,
-        )
+_SOURCES = [Path(__file__).parent / "hershey-occidental.json", Path(__file__).parent / "encodings.yml"]
+_SPACE_CODES = [699, 2199, 2699, 2749, 3199, 3699]
+
+# Compiled glyph store, which is loaded on first use
+_store = None
+_glyphs = {}
 
-# Load ascii/hershey code mapping
-with open(Path(__file__).parent / 'encodings.yml', 'r') as encodings_file:
-    hershey_code_by_ascii = yaml.load(encodings_file)
+
+def _compile(path):
+    """
+    Compiles the Hershey glyphs and encodings into a packed glyph store.
+
+    Points of all lines are packed into `path`.npy, which is memory-mapped when loading. Offset tables of lines and
+    glyphs, margins and encodings are stored in `path`.npz.
+    """
+    import json
+    import yaml
+
+    with open(_SOURCES[0], "r") as read_file:
+        glyphs = json.load(read_file)
+    with open(_SOURCES[1], 'r') as encodings_file:
+        encodings = yaml.safe_load(encodings_file)
+
+    glyphs = sorted(glyphs, key=lambda glyph: glyph['charcode'])
+    glyphs += [dict(charcode=code, lines=[], left=-5, right=5) for code in _SPACE_CODES]  # Add space glyphs
+    lines = [line for glyph in glyphs for line in glyph["lines"]]
+    coords = np.array([point for line in lines for point in line], dtype=np.int64).reshape(-1, 2) * [1, -1]  # Flip
+    fonts = sorted(encodings)
+    tables = dict(
+        codes=np.array([glyph['charcode'] for glyph in glyphs]),
+        line_offsets=np.concatenate([[0], np.cumsum([len(line) for line in lines])]),
+        glyph_offsets=np.concatenate([[0], np.cumsum([len(glyph["lines"]) for glyph in glyphs])]),
+        margins=np.array([(glyph["left"], glyph["right"]) for glyph in glyphs]),
+        fonts=np.array(fonts),
+        encoding_fonts=np.repeat(np.arange(len(fonts)), [len(encodings[font]) for font in fonts]),
+        encoding_chars=np.array([c for font in fonts for c in encodings[font]]),
+        encoding_codes=np.array([code for font in fonts for code in encodings[font].values()]),
+    )
+
+    # Write to temporary files first, so concurrent processes never load partial files
+    for suffix, save, data in [('.npy', np.save, [coords]), ('.npz', np.savez, [])]:
+        fd, tmp = tempfile.mkstemp(suffix=suffix, dir=path.parent)
+        with os.fdopen(fd, 'wb') as f:
+            save(f, *data, **(tables if suffix == '.npz' else {}))
+        os.replace(tmp, str(path) + suffix)
+
+
+def _load():
+    """
+    Loads the glyph store, which is compiled into the temporary directory if it doesn't exist yet.
+    """
+    global _store
+    if _store is None:
+        # Recompile whenever a source changes
+        key = '-'.join('%x-%x' % (s.stat().st_size, s.stat().st_mtime_ns) for s in _SOURCES)
+        path = Path(tempfile.gettempdir()) / 'pen_plots' / ('hershey-%s' % key)
+        if not Path(str(path) + '.npz').exists():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                _compile(path)
+            except OSError:  # Shared directory isn't writable
+                path = Path(tempfile.mkdtemp()) / 'hershey'
+                _compile(path)
+
+        with np.load(str(path) + '.npz') as tables:
+            store = {key: tables[key] for key in tables.files}
+        store['coords'] = np.load(str(path) + '.npy', mmap_mode='r').view(np.ndarray)
+        store['index_by_code'] = dict(zip(store['codes'].tolist(), range(len(store['codes']))))
+        store['code_by_ascii'] = {font: {} for font in store['fonts'].tolist()}
+        for font, c, code in zip(store['encoding_fonts'], store['encoding_chars'], store['encoding_codes']):
+            store['code_by_ascii'][store['fonts'][font]][int(c)] = int(code)
+        store['advance'] = (store['margins'][:, 1] - store['margins'][:, 0]).astype(float)
+        store['ink'] = ink_extents(
+            store['coords'], store['line_offsets'][store['glyph_offsets']], store['margins'][:, 0]
+        )
+        _store = store
+    return _store
 
 
 def glyph_by_hershey_code(hershey_code):
     """
-    Returns the Hershey glyph corresponding to `hershey_code`.
+    Returns the Hershey glyph corresponding to `hershey_code`. Lines are read-only views into the glyph store.
     """
-    glyph = glyphs_by_hershey_code.get(hershey_code)
+    glyph = _glyphs.get(hershey_code)
     if glyph is None:
-        raise ValueError("No glyph for hershey code %d" % hershey_code)
+        store = _load()
+        i = store['index_by_code'].get(hershey_code)
+        if i is None:
+            raise ValueError("No glyph for hershey code %d" % hershey_code)
+        offsets = store['line_offsets'][store['glyph_offsets'][i]:store['glyph_offsets'][i + 1] + 1]
+        glyph = Glyph(
+            lines=[store['coords'][start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+            left=int(store['margins'][i, 0]),
+            right=int(store['margins'][i, 1]),
+        )
+        _glyphs[hershey_code] = glyph
     return glyph
 
 
@@ -42,9 +109,26 @@ def glyph_by_char(c, font):
     Returns the Hershey glyph for char `c` in `font`.
     """
     ascii_code = ord(c)
-    hershey_code = hershey_code_by_ascii[font].get(ascii_code)
+    hershey_code = _load()['code_by_ascii'][font].get(ascii_code)
 
     if hershey_code is None:
         raise ValueError("No Hershey code for ascii char '%s' (%d)" % (c, ascii_code))
 
     return glyph_by_hershey_code(hershey_code)
+
+
+def metrics_by_char(text, font):
+    """
+    Returns the metrics of the Hershey glyphs for the chars of `text` in `font` from precomputed tables, see
+    `pen_plots.fonts.glyph_metrics`.
+    """
+    store = _load()
+    code_by_ascii = store['code_by_ascii'][font]
+    indices = []
+    for c in text:
+        hershey_code = code_by_ascii.get(ord(c))
+        if hershey_code is None:
+            raise ValueError("No Hershey code for ascii char '%s' (%d)" % (c, ord(c)))
+        indices.append(store['index_by_code'][hershey_code])
+    indices = np.array(indices, dtype=int)
+    return store['advance'][indices], store['ink'][indices]
@@ -0,0 +1,150 @@
+"""
+This module measures text from per-glyph metrics without generating any strokes.
+
+Metrics of a glyph are its advance, i.e. the distance between its margins, and its ink extent, i.e. the bounding box of
+its lines relative to the pen position at its left margin. Both are in font units, i.e. at font size 21.
+"""
+import numpy as np
+
+
+def ink_extents(coords, offsets, left):
+    """
+    Computes ink extents of glyphs from their packed points.
+
+    Parameters
+    ----------
+    coords : ndarray (P, 2)
+        Points of all lines of all glyphs.
+    offsets : ndarray (G + 1,)
+        Glyph i consists of points `coords[offsets[i]:offsets[i + 1]]`.
+    left : ndarray (G,)
+        Left margins of the glyphs.
+
+    Returns
+    -------
+    ndarray (G, 2, 2)
+        Bounding box of each glyph, where second dimension is min/max and the third is x/y. NaN for glyphs without
+        lines, e.g. spaces.
+    """
+    offsets = np.asarray(offsets)
+    ink = np.full((len(offsets) - 1, 2, 2), np.nan)
+    inked = np.flatnonzero(np.diff(offsets) > 0)
+    if len(inked) > 0:
+        ink[inked, 0] = np.minimum.reduceat(coords, offsets[inked], axis=0)
+        ink[inked, 1] = np.maximum.reduceat(coords, offsets[inked], axis=0)
+    ink[:, :, 0] -= np.asarray(left, dtype=float)[:, np.newaxis]
+    return ink
+
+
+def glyph_metrics(glyphs):
+    """
+    Computes metrics of glyphs, see `ink_extents`.
+
+    Returns
+    -------
+    advance : ndarray (G,)
+    ink : ndarray (G, 2, 2)
+    """
+    counts = [sum(len(line) for line in glyph.lines) for glyph in glyphs]
+    coords = [line for glyph in glyphs for line in glyph.lines]
+    coords = np.concatenate(coords, axis=0).astype(float) if len(coords) > 0 else np.zeros((0, 2))
+    left, right = np.array([[glyph.left, glyph.right] for glyph in glyphs], dtype=float).reshape(-1, 2).T
+    return right - left, ink_extents(coords, np.concatenate([[0], np.cumsum(counts)]).astype(int), left)
+
+
+def measure_glyphs(advance, ink, font_size=21, alignment='left'):
+    """
+    Computes the bounding box of glyphs placed by `glyphs_to_strokes` from their metrics.
+
+    Parameters
+    ----------
+    advance, ink : ndarray
+        Metrics of the glyphs, see `glyph_metrics`.
+    font_size/alignment
+        Same as for `glyphs_to_strokes`.
+
+    Returns
+    -------
+    ndarray (2, 2)
+        where first dimension is min/max and the second is x/y. NaN if no glyph has any lines.
+    """
+    if np.all(np.isnan(ink)):
+        return np.full((2, 2), np.nan)
+    pen = np.concatenate([[0], np.cumsum(advance)])
+    shift = {'left': 0, 'right': -pen[-1], 'center': -pen[-1] / 2}[alignment]
+    ink = ink + np.stack([pen[:-1] + shift, np.zeros(len(advance))], axis=-1)[:, np.newaxis]
+    return np.array([np.nanmin(ink[:, 0], axis=0), np.nanmax(ink[:, 1], axis=0)]) * (25.4 / 72 * font_size / 21)
+
+
+def break_glyphs(advance, ink, breakable, max_width, font_size=21):
+    """
+    Breaks a sequence of glyphs into lines, whose ink is at most `max_width` wide.
+
+    Lines are filled greedily. Each line is measured for all candidate breaks at once by running extrema of the ink
+    extents, so no strokes are generated. Breakable glyphs, i.e. spaces, at the end of a line are dropped.
+
+    Parameters
+    ----------
+    advance, ink : ndarray
+        Metrics of the glyphs, see `glyph_metrics`.
+    breakable : ndarray (G,)
+        Whether a line may be broken at each glyph.
+    max_width : mm
+        Maximum width of a line.
+    font_size : float
+        Same as for `glyphs_to_strokes`.
+
+    Returns
+    -------
+    list of tuples
+        Start and end index of the glyphs of each line. Words wider than `max_width` are kept in a line of their own.
+    """
+    breakable = np.asarray(breakable, dtype=bool)
+    pen = np.concatenate([[0], np.cumsum(advance)])[:-1]
+    ink_min, ink_max = pen + ink[:, 0, 0], pen + ink[:, 1, 0]
+    max_width = max_width / (25.4 / 72 * font_size / 21)
+
+    lines = []
+    start = 0
+    while True:
+        while start < len(breakable) and breakable[start]:
+            start += 1
+        if start >= len(breakable):
+            return lines
+        # Lines may end before each breakable glyph or at the end
+        ends = np.append(start + np.flatnonzero(breakable[start:]), len(breakable))
+        ends = ends[np.concatenate([[True], ends[1:] > ends[:-1] + 1])]  # Skip consecutive breakable glyphs
+        # Widths grow with the end of the line, so the last fitting break is the end of the fitting prefix
+        width = np.fmax.accumulate(ink_max[start:]) - np.fmin.accumulate(ink_min[start:])
+        end = ends[max(np.sum(~(width[ends - 1 - start] > max_width)) - 1, 0)]
+        lines.append((start, int(end)))
+        start = end
+
+
+def measure_text(text, font_size=21, font='rowmans', alignment='left'):
+    """
+    Computes the bounding box of `text` in a Hershey font from precomputed metrics, i.e. without generating strokes.
+
+    Returns
+    -------
+    ndarray (2, 2)
+        Same as `bounding_box` of the strokes of the text, see `measure_glyphs`.
+    """
+    from pen_plots.fonts.hershey import metrics_by_char
+
+    return measure_glyphs(*metrics_by_char(text, font), font_size=font_size, alignment=alignment)
+
+
+def wrap_text(text, max_width, font_size=21, font='rowmans'):
+    """
+    Wraps `text` in a Hershey font at spaces into lines, whose ink is at most `max_width` wide, see `break_glyphs`.
+
+    Returns
+    -------
+    list of str
+    """
+    from pen_plots.fonts.hershey import metrics_by_char
+
+    breakable = np.array([c == ' ' for c in text], dtype=bool)
+    lines = break_glyphs(*metrics_by_char(text, font), breakable, max_width, font_size=font_size)
+    return [text[start:end] for start, end in lines]
@@ -1,6 +1,107 @@
 """
 This module concerns converting strokes to gcode.
 """
+import numpy as np
+from pen_plots.strokes import StrokeBuffer, StrokeGroup
+
+# Maximum number of points formatted at once
+_CHUNK_SIZE = 2**16
+
+
+def _chunks(offsets):
+    """
+    Yields ranges of strokes given by their `offsets`, such that each range contains about `_CHUNK_SIZE` points.
+    """
+    bounds = np.searchsorted(offsets, np.arange(_CHUNK_SIZE, offsets[-1], _CHUNK_SIZE))
+    bounds = np.unique(np.concatenate([[0], bounds, [len(offsets) - 1]]))
+    return zip(bounds[:-1], bounds[1:])
+
+
+# Kinds of lines written in compact mode
+_PEN_UP, _FIRST_MOVE, _MOVE, _PEN_DOWN, _DRAW, _ARC_CW, _ARC_CCW = range(7)
+
+
+def _write_compact(writer, strokes, coords, gap, arcs, z_hop, feedrates, precision, relative):
+    """
+    Writes strokes with modal feedrates, G1 drawing moves and without unchanged axes. See `write_gcode` for details.
+    """
+    position = np.round(coords * 10**precision).astype(np.int64)
+    number = '%%.%df' % precision
+
+    # Lines of each point are ordered as: pen up, move to start or draw, pen down
+    move = strokes.offsets[:-1][~gap]
+    point = np.concatenate([move[1:], np.arange(len(position)), move])
+    kind = np.concatenate(
+        [np.full(len(move) - 1, _PEN_UP),
+         np.full(len(position), _DRAW),
+         np.full(len(move), _PEN_DOWN)]
+    )
+    kind[len(move) - 1 + move] = _MOVE
+    kind[len(move) - 1] = _FIRST_MOVE
+    order = np.lexsort((np.repeat([0, 1, 2], [len(move) - 1, len(position), len(move)]), point))
+    point, kind = point[order], kind[order]
+    is_draw = kind == _DRAW
+    kind[is_draw & (arcs[point, 2] < 0)] = _ARC_CW
+    kind[is_draw & (arcs[point, 2] > 0)] = _ARC_CCW
+    is_arc = (kind == _ARC_CW) | (kind == _ARC_CCW)
+
+    # Axes, which change with respect to the previous move
+    is_move = (kind == _FIRST_MOVE) | (kind == _MOVE) | is_draw
+    moves = np.flatnonzero(is_move)
+    changed = np.zeros((len(kind), 2), dtype=bool)
+    changed[moves[0]] = True
+    changed[moves[1:]] = position[point[moves[1:]]] != position[point[moves[:-1]]]
+    delta = position[point].copy()
+    if relative:
+        delta[moves[1:]] -= position[point[moves[:-1]]]
+    # Arc centers relative to the start of the arc
+    center = np.zeros((len(kind), 2))
+    center[is_arc] = arcs[point[is_arc], :2] - position[point[is_arc] - 1] / 10**precision
+
+    # Skip moves without any change, including pen up and down of skipped moves to the start of a stroke
+    keep = ~is_move | np.any(changed, axis=-1) | is_arc | (kind == _FIRST_MOVE)
+    kept_move = np.zeros(len(position), dtype=bool)
+    kept_move[point[kind == _MOVE]] = keep[kind == _MOVE]
+    kept_move[0] = True
+    keep[(kind == _PEN_UP) | (kind == _PEN_DOWN)] = kept_move[point[(kind == _PEN_UP) | (kind == _PEN_DOWN)]]
+    kind = np.append(kind[keep], _PEN_UP)
+    changed = np.append(changed[keep], [[False, False]], axis=0)
+    values = np.append(delta[keep], [[0, 0]], axis=0) / 10**precision
+    values = np.concatenate([values, np.append(center[keep], [[0, 0]], axis=0)], axis=-1)
+    present = np.concatenate([changed, np.repeat(np.append(is_arc[keep], False)[:, np.newaxis], 2, axis=-1)], axis=-1)
+
+    # Feedrates are only written, when they change
+    feedrate = np.asarray(feedrates)[kind]
+    feedrate_changed = np.concatenate([[True], feedrate[1:] != feedrate[:-1]])
+
+    # Template of each combination of kind and present words
+    z = {
+        _PEN_UP: ' Z' + number % z_hop,
+        _FIRST_MOVE: ' Z' + number % z_hop + ('\nG91' if relative else ''),
+        _MOVE: '',
+        _PEN_DOWN: ' Z' + number % (-z_hop if relative else 0),
+        _DRAW: '',
+        _ARC_CW: ' I%s J%s' % (number, number),
+        _ARC_CCW: ' I%s J%s' % (number, number),
+    }
+    command = {_DRAW: 'G1', _ARC_CW: 'G2', _ARC_CCW: 'G3'}
+    templates = []
+    for k in range(7):
+        for f in range(2):
+            for x in range(2):
+                for y in range(2):
+                    words = [
+                        command.get(k, 'G0'),
+                        ' F%d' % feedrates[k] if f else '', ' X' + number if x else '', ' Y' + number if y else '',
+                        z[k], '\n'
+                    ]
+                    templates.append(''.join(words))
+    code = 8 * kind + 4 * feedrate_changed + 2 * changed[:, 0] + changed[:, 1]
+    lines = np.asarray(templates, dtype=object)[code]
+
+    for start in range(0, len(lines), _CHUNK_SIZE):
+        end = start + _CHUNK_SIZE
+        writer.write(''.join(lines[start:end].tolist()) % tuple(values[start:end][present[start:end]].tolist()))
 
 
 def write_gcode(
@@ -13,6 +114,11 @@ def write_gcode(
     feedrate_z_hop=300,
     start_gcode='G28\nG21\n',
     end_gcode='G28 X0 Y0\n',
+    min_lift_distance=0,
+    compact=False,
+    precision=3,
+    relative=False,
+    arcs=None,
 ):
     """
     Converts strokes to gcode.
@@ -21,7 +127,7 @@ def write_gcode(
     ----------
     writer : writable
         Openend output file.
-    strokes : list of strokes
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
         Strokes to be plotted.
     offset : array_like (2,)
         Offset to be applied to all points. Useful for positioning the drawn image on the paper.
@@ -31,7 +137,29 @@ def write_gcode(
         feedrates used for drawing.
     start_gcode/end_gcode : str
         instruction to set up and clean up the plotter.
+    min_lift_distance : mm
+        Gaps between strokes shorter than this are drawn instead of lifting the pen. Defaults to 0, i.e. always lift
+        the pen.
+    compact : bool
+        Write feedrates only when they change, use G1 for drawing moves and omit axes, which don't change. Moves
+        without any change are skipped. Results in considerably smaller files.
+    precision : int
+        Number of decimal places of coordinates.
+    relative : bool
+        Write coordinates relative to the previous position (G91) after moving to the first stroke. Requires `compact`.
+        Deltas are computed from rounded positions, so rounding errors don't accumulate.
+    arcs : array_like (P, 3)
+        Arc of the move to each point of `strokes` as returned by `pen_plots.strokes.fit_arcs`. Moves along arcs are
+        written as G2/G3 with the center relative to the start of the arc. Defaults to linear moves only.
+
+    Raises
+    ------
+    ValueError
+        when `relative` is set without `compact` or `arcs` don't match the points of `strokes`.
     """
+    if relative and not compact:
+        raise ValueError("Relative coordinates require compact mode")
+
     # Write start
     if start_gcode is not None:
         writer.write(start_gcode)
@@ -39,24 +167,65 @@ def write_gcode(
             writer.write('\n')
 
     # Write strokes
-    for stroke in strokes:
-        # Move to start
-        writer.write(
-            'G0 F%d X%.03f Y%.03f Z%.03f\n' %
-            (feedrate_travel, offset[0] + stroke[0][0], offset[1] + stroke[0][1], z_hop)
-        )
-        # Pen down
-        writer.write('G0 F%d Z%.03f\n' % (feedrate_z_hop, 0))
-
-        # Draw lines
-        for i in range(1, len(stroke)):
-            writer.write('G0 F%d X%.03f Y%.03f\n' % (feedrate_draw, offset[0] + stroke[i][0], offset[1] + stroke[i][1]))
-
-        # Pen up
-        writer.write('G0 F%d Z%.03f\n' % (feedrate_z_hop, z_hop))
+    strokes = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    if len(strokes) > 0:
+        coords = np.asarray(offset) + strokes.coords
+        starts, ends = strokes.coords[strokes.offsets[:-1]], strokes.coords[strokes.offsets[1:] - 1]
+        # Gaps to the previous stroke, which are drawn instead of lifting the pen
+        gap = np.zeros(len(strokes), dtype=bool)
+        gap[1:] = np.sqrt(np.sum(np.square(starts[1:] - ends[:-1]), axis=-1)) < min_lift_distance
+
+        if arcs is not None:
+            arcs = np.asarray(arcs, dtype=float)
+            if arcs.shape != (len(coords), 3):
+                raise ValueError("Expected an arc for each of the %d points, got shape %s" % (len(coords), arcs.shape))
+            arcs = np.concatenate([arcs[:, :2] + offset, arcs[:, 2:]], axis=-1)
+
+        if compact:
+            feedrates = [feedrate_z_hop, feedrate_travel, feedrate_travel, feedrate_z_hop] + [feedrate_draw] * 3
+            arcs = np.zeros((len(coords), 3)) if arcs is None else arcs
+            _write_compact(writer, strokes, coords, gap, arcs, z_hop, feedrates, precision, relative)
+        else:
+            number = '%%.%df' % precision
+            draw = 'G0 F%d X%s Y%s\n' % (feedrate_draw, number, number)
+            pen_up = 'G0 F%d Z%s\n' % (feedrate_z_hop, number % z_hop)
+            # Move to start and pen down
+            move = 'G0 F%d X%s Y%s Z%s\n' % (feedrate_travel, number, number, number % z_hop) + \
+                'G0 F%d Z%s\n' % (feedrate_z_hop, number % 0)
+            first_line = np.where(gap, draw, pen_up + move).tolist()
+            first_line[0] = move
+            n_lines = (strokes.lengths - 1).tolist()
+
+            if arcs is not None:
+                # Template of each point, arcs additionally format their center relative to the previous point
+                arc = ' I%s J%s\n' % (number, number)
+                line = np.asarray(
+                    [draw, draw[:-1].replace('G0', 'G2', 1) + arc, draw[:-1].replace('G0', 'G3', 1) + arc]
+                )
+                line = line.astype(object)[np.abs(arcs[:, 2]).astype(int) + (arcs[:, 2] > 0)]
+                line[strokes.offsets[:-1]] = first_line
+                center = arcs[:, :2] - np.roll(coords, 1, axis=0)
+                values = np.concatenate([coords, center], axis=-1)
+                present = np.repeat(arcs[:, 2:] != 0, 4, axis=-1)
+                present[:, :2] = True
+
+            for chunk_start, chunk_end in _chunks(strokes.offsets):
+                # Format all points of a chunk of strokes at once, each stroke is a template of its lines
+                a, b = strokes.offsets[chunk_start], strokes.offsets[chunk_end]
+                if arcs is None:
+                    template = ''.join([first_line[i] + draw * n_lines[i] for i in range(chunk_start, chunk_end)])
+                    writer.write(template % tuple(coords[a:b].ravel().tolist()))
+                else:
+                    writer.write(''.join(line[a:b].tolist()) % tuple(values[a:b][present[a:b]].tolist()))
+
+            # Pen up
+            writer.write(pen_up)
+
+        if relative:
+            writer.write('G90\n')
 
     # Write end
     if end_gcode is not None:
         writer.write(end_gcode)
-        if start_gcode[-1] != '\n':
+        if end_gcode[-1] != '\n':
             writer.write('\n')
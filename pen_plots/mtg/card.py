@@ -1,11 +1,13 @@
 import numpy as np
-from pen_plots.strokes import to_strokes, translate, rounded_rectangle, circle, concat, rectangle, bounding_box, scale_to_fit
-from pen_plots.fonts import glyphs_to_strokes
-from pen_plots.mtg.glyphs import line_to_glyphs
-from textwrap import wrap
+from pen_plots.strokes import translate, rounded_rectangle, circle, concat, rectangle, bounding_box, scale_to_fit, clip
+from pen_plots.strokes import StrokeBuffer
+from pen_plots.mtg.glyphs import layout_line, measure_line, wrap_line
 
 from pen_plots.mtg import strip_reminders, join_keyword_lines
 
+# Frame strokes and P/T bar bounding box by P/T bar width
+_frames = {}
+
 
 def _replace_chars(string):
     """
@@ -35,9 +37,47 @@ def difference(strokes, area):
     """
     Computes set difference of a list of strokes and an area specified by a stroke.
     """
-    from shapely.geometry import Polygon, MultiLineString
+    return clip(strokes, polygon=area, inside=False)
 
-    return to_strokes(MultiLineString(strokes).difference(Polygon(area)))
+
+def fit_scale(fits, min_scale=1 / 64, tolerance=1 / 256):
+    """
+    Finds the largest scale in (0, 1], at which a layout fits, by binary search.
+
+    Parameters
+    ----------
+    fits : callable
+        Returns whether the layout fits at a given scale. Smaller scales are assumed to fit, whenever a scale fits.
+    min_scale : float
+        Smallest scale to try.
+    tolerance : float
+        Maximum difference between the returned scale and the largest fitting one.
+
+    Returns
+    -------
+    scale : float
+        Largest fitting scale found.
+    iterations : int
+        Number of scales tried.
+
+    Raises
+    ------
+    ValueError
+        If the layout doesn't fit at `min_scale`.
+    """
+    if fits(1):
+        return 1.0, 1
+    lower, upper, iterations = 0.0, 1.0, 1
+    while upper - lower > tolerance or lower == 0:
+        scale = (lower + upper) / 2 if lower > 0 or upper / 2 >= min_scale else min_scale
+        iterations += 1
+        if fits(scale):
+            lower = scale
+        elif scale <= min_scale:
+            raise ValueError('Layout does not fit at scale %f' % min_scale)
+        else:
+            upper = scale
+    return lower, iterations
 
 
 def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=None, toughness=None, loyalty=None):
@@ -88,42 +128,63 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
     oracle_text_par_skip = 2 / 3
     oracle_text_font_size = 5
 
-    strokes = []
+    has_pt_bar = power is not None and toughness is not None or loyalty is not None
+    pt_bar_width = (8 if loyalty is None else 4) if has_pt_bar else None
 
-    # Outer border
-    strokes.append(rounded_rectangle(63, 88, outer_rounding, 8))
-    # Outer border inner
-    strokes.append(
-        translate(
-            rounded_rectangle(63 - outer_rounding * 2, 88 - outer_rounding * 2 - bottom_border_extra, 1, 8),
-            x=outer_rounding,
-            y=outer_rounding + bottom_border_extra,
-        )
-    )
+    # Frame only differs by the P/T bar, hence each variant is built once and copied
+    frame = _frames.get(pt_bar_width)
+    if frame is None:
+        frame_strokes = []
 
-    # Title bar
-    strokes.append(translate(bar_rectangle(x_right - x_left, y_title_top - y_title_bottom, 8), x_left, y_title_bottom))
+        # Outer border
+        frame_strokes.append(rounded_rectangle(63, 88, outer_rounding, 8))
+        # Outer border inner
+        frame_strokes.append(
+            translate(
+                rounded_rectangle(63 - outer_rounding * 2, 88 - outer_rounding * 2 - bottom_border_extra, 1, 8),
+                x=outer_rounding,
+                y=outer_rounding + bottom_border_extra,
+            )
+        )
 
-    # Image Box
-    strokes.append(translate(rectangle(x_right - x_left, y_img_top - y_img_bottom), x_left, y_img_bottom))
+        # Title bar
+        frame_strokes.append(
+            translate(bar_rectangle(x_right - x_left, y_title_top - y_title_bottom, 8), x_left, y_title_bottom)
+        )
 
-    # Type bar
-    strokes.append(translate(bar_rectangle(x_right - x_left, y_type_top - y_type_bottom, 8), x_left, y_type_bottom))
+        # Image Box
+        frame_strokes.append(translate(rectangle(x_right - x_left, y_img_top - y_img_bottom), x_left, y_img_bottom))
 
-    # Power/Toughness, loyality
-    if power is not None and toughness is not None or loyalty is not None:
-        # P/T bar
-        pt_bar_width = 8 if loyalty is None else 4
-        pt_bar = translate(bar_rectangle(pt_bar_width, 5, 8), x_right - pt_bar_width, y_text_bottom - 1)
-        pt_bar_bbox = bounding_box(pt_bar)
-        strokes.append(pt_bar)
+        # Type bar
+        frame_strokes.append(
+            translate(bar_rectangle(x_right - x_left, y_type_top - y_type_bottom, 8), x_left, y_type_bottom)
+        )
 
-        # P/T text
+        # Text box
+        text_box = translate(
+            rectangle(x_text_right - x_text_left, y_text_top - y_text_bottom), x_text_left, y_text_bottom
+        )
+        if pt_bar_width is None:
+            frame_strokes.append(text_box)
+            pt_bar_bbox = None
+        else:
+            # P/T bar, power/toughness or loyality
+            pt_bar = translate(bar_rectangle(pt_bar_width, 5, 8), x_right - pt_bar_width, y_text_bottom - 1)
+            pt_bar_bbox = bounding_box(pt_bar)
+            frame_strokes.append(pt_bar)
+            # Draw around P/T bar
+            frame_strokes.extend(difference([text_box], pt_bar))
+
+        frame = _frames[pt_bar_width] = (StrokeBuffer.from_strokes(frame_strokes), pt_bar_bbox)
+    strokes, pt_bar_bbox = frame[0].copy().to_list(), frame[1]
+
+    # P/T text
+    if has_pt_bar:
         strokes.extend(
             translate(
                 scale_to_fit(
-                    glyphs_to_strokes(
-                        line_to_glyphs(power + '/' + toughness if loyalty is None else loyalty),
+                    layout_line(
+                        power + '/' + toughness if loyalty is None else loyalty,
                         font_size=7,
                         alignment='center',
                     ),
@@ -133,20 +194,10 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
                 y_text_bottom - 1 + 5 / 2,
             )
         )
-    else:
-        pt_bar_bbox = None
-
-    # Text box
-    text_box = translate(rectangle(x_text_right - x_text_left, y_text_top - y_text_bottom), x_text_left, y_text_bottom)
-    if pt_bar_bbox is None:
-        strokes.append(text_box)
-    else:
-        # Draw around P/T bar
-        strokes.extend(difference([text_box], pt_bar))
 
     # Mana Cost
     if len(mana_cost) > 0:
-        text_mana_cost = glyphs_to_strokes(line_to_glyphs(mana_cost), font_size=6, alignment='right')
+        text_mana_cost = layout_line(mana_cost, font_size=6, alignment='right')
         x_mana_cost_left = x_right + bounding_box(text_mana_cost)[0, 0] - margin_x_text
         strokes.extend(
             translate(
@@ -165,7 +216,7 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
     strokes.extend(
         translate(
             scale_to_fit(
-                glyphs_to_strokes(line_to_glyphs(card_title), font_size=6),
+                layout_line(card_title, font_size=6),
                 max_width=x_mana_cost_left - x_left - margin_x_text * 2,
             ),
             x_left + margin_x_text,
@@ -177,7 +228,7 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
     strokes.extend(
         translate(
             scale_to_fit(
-                glyphs_to_strokes(line_to_glyphs(card_type), font_size=6),
+                layout_line(card_type, font_size=6),
                 max_width=x_right - x_left - margin_x_text * 2,
             ),
             x_left + margin_x_text,
@@ -188,9 +239,13 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
     # Oracle text
     if len(oracle_text) > 0:
         x_line_left = x_text_left + margin_x_text
-        oracle_text_scale = 1
-        while True:
-            oracle_text_strokes = []
+
+        def layout_oracle_text(oracle_text_scale):
+            """
+            Wraps the oracle text at a scale and places its lines from glyph metrics, i.e. without strokes.
+            """
+            font_size = oracle_text_font_size * oracle_text_scale
+            lines, bboxes = [], []
             oracle_text_top_offset = (oracle_text_line_height + oracle_text_par_skip) * oracle_text_scale / 2
             for oracle_text_line in oracle_text.split('\n'):
                 while len(oracle_text_line) > 0:
@@ -198,47 +253,49 @@ def create_card(card_title, card_type, mana_cost=None, oracle_text=None, power=N
                         x_text_right if pt_bar_bbox is None or pt_bar_bbox[1, 1] < y_text_top - oracle_text_top_offset -
                         oracle_text_par_skip * oracle_text_scale else pt_bar_bbox[0, 0]
                     ) - margin_x_text
-                    n_line_chars = 42.5 * (x_line_right - x_line_left - margin_x_text * 2
-                                          ) / (x_text_right - x_text_left) / oracle_text_scale
-
-                    line = wrap(oracle_text_line, n_line_chars)[0]  # TODO Calculate wrap based on actual char sizes
-                    oracle_text_line = oracle_text_line[len(line) + 1:]
-
-                    oracle_text_strokes.extend(
-                        translate(
-                            scale_to_fit(
-                                glyphs_to_strokes(
-                                    line_to_glyphs(line),
-                                    font_size=oracle_text_font_size * oracle_text_scale,
-                                ),
-                                max_width=x_line_right - x_line_left,
-                            ),
-                            x_line_left,
-                            y_text_top - oracle_text_top_offset,
-                        )
-                    )
+                    max_width = x_line_right - x_line_left
+
+                    wrapped = wrap_line(oracle_text_line, max_width, font_size=font_size)
+                    if len(wrapped) == 0:  # Only spaces left
+                        break
+                    line = wrapped[0]
+                    oracle_text_line = oracle_text_line[len(line):].lstrip(' ')
+
+                    # Same as scale_to_fit for words wider than a line
+                    bbox = measure_line(line, font_size=font_size)
+                    bbox[:, 0] *= min(max_width / (bbox[1, 0] - bbox[0, 0]), 1)
+                    position = [x_line_left, y_text_top - oracle_text_top_offset]
+                    lines.append((line, font_size, max_width, position))
+                    bboxes.append(bbox + position)
                     oracle_text_top_offset += oracle_text_line_height * oracle_text_scale
                 oracle_text_top_offset += oracle_text_par_skip * oracle_text_scale
-
-            # Check if text fits
-            if bounding_box(oracle_text_strokes)[0][1] > y_text_bottom + oracle_text_par_skip * oracle_text_scale / 2:
-
-                # Check if text doesn't collide with pt bar:
-                collision = False
-                if pt_bar_bbox is not None:
-                    for stroke in oracle_text_strokes:
-                        for p in stroke:
-                            if p[0] >= pt_bar_bbox[0][0] and p[0] <= pt_bar_bbox[1][0] and p[1] >= pt_bar_bbox[0][
-                                1
-                            ] and p[1] <= pt_bar_bbox[1][1]:
-                                collision = True
-
-                if not collision:
-                    strokes.extend(oracle_text_strokes)
-                    if oracle_text_scale < 1:
-                        print('Scaled oracle text to %f' % oracle_text_scale)
-                    break
-            oracle_text_scale *= 0.99
+            return lines, np.reshape(bboxes, (-1, 2, 2))
+
+        def oracle_text_fits(oracle_text_scale):
+            lines, bboxes = layout_oracle_text(oracle_text_scale)
+            y_min = y_text_bottom + oracle_text_par_skip * oracle_text_scale / 2
+            if len(bboxes) > 0 and not np.nanmin(bboxes[:, 0, 1]) > y_min:
+                return False
+            if pt_bar_bbox is None:
+                return True
+            # No point of the lines may lie on the P/T bar. Bounding boxes only preselect the lines to check, as a
+            # line may pass the corner of the bar without touching it.
+            overlaps = np.all((bboxes[:, 0] <= pt_bar_bbox[1]) & (bboxes[:, 1] >= pt_bar_bbox[0]), axis=-1)
+            for line, font_size, max_width, position in (lines[i] for i in np.flatnonzero(overlaps)):
+                points = np.concatenate(
+                    translate(scale_to_fit(layout_line(line, font_size=font_size), max_width=max_width), *position)
+                )
+                if np.any(np.all((points >= pt_bar_bbox[0]) & (points <= pt_bar_bbox[1]), axis=-1)):
+                    return False
+            return True
+
+        oracle_text_scale, iterations = fit_scale(oracle_text_fits)
+        if oracle_text_scale < 1:
+            print('Scaled oracle text to %f in %d iterations' % (oracle_text_scale, iterations))
+        for line, font_size, max_width, position in layout_oracle_text(oracle_text_scale)[0]:
+            strokes.extend(
+                translate(scale_to_fit(layout_line(line, font_size=font_size), max_width=max_width), *position)
+            )
 
     return strokes
 
@@ -1,8 +1,10 @@
 import numpy as np
 import re
-from pen_plots.fonts import Glyph, combine_glyphs, transform_glyph
-from pen_plots.fonts.hershey import glyph_by_char, glyph_by_hershey_code
-from pen_plots.strokes import bounding_box
+from functools import lru_cache
+from pen_plots.fonts import Glyph, combine_glyphs, transform_glyph, glyphs_to_strokes
+from pen_plots.fonts import glyph_metrics, measure_glyphs, break_glyphs
+from pen_plots.fonts.hershey import glyph_by_char, glyph_by_hershey_code, metrics_by_char
+from pen_plots.strokes import bounding_box, scale
 from pen_plots.strokes.transformation import rotation_matrix, scaling_matrix
 
 
@@ -56,11 +58,18 @@ for c in ['%d' % i for i in range(10, 17)]:
 # {2/W},{2/U},{2/B},{2/R},{2/G} Monocolored hybrid mana
 # {W/P},{U/P},{B/P},{R/P},{G/P}: Phyrexian mana
 
+# Advance and ink extent of each special glyph, see `pen_plots.fonts.glyph_metrics`
+special_metrics = dict(zip(special_glyphs, zip(*glyph_metrics(list(special_glyphs.values())))))
 
-def line_to_glyphs(line):
+
+def _tokens(line):
+    return re.findall(r'([^{]|\{[^}]*\})', line)
+
+
+def line_to_glyphs(line, font='rowmans'):
     glyphs = []
 
-    for c in re.findall(r'([^{]|\{[^}]*\})', line):
+    for c in _tokens(line):
         if c[0] == '{':
             g = special_glyphs.get(c)
             if g is not None:
@@ -68,6 +77,78 @@ def line_to_glyphs(line):
             else:
                 raise ValueError('Unknown special sequence %s' % c)
         else:
-            glyphs.append(glyph_by_char(c, 'rowmans'))
+            glyphs.append(glyph_by_char(c, font))
 
     return glyphs
+
+
+@lru_cache(maxsize=4096)
+def _cached_layout(line, font, alignment):
+    group = glyphs_to_strokes(line_to_glyphs(line, font), alignment=alignment, lazy=True)
+    group.strokes.coords.flags.writeable = False
+    if len(group) > 0:
+        group.bounding_box()  # Cache bounding box of the untransformed points
+    return group
+
+
+def layout_line(line, font_size=21, alignment='left', font='rowmans'):
+    """
+    Lays out a single line of text including special sequences, see `line_to_glyphs` and `glyphs_to_strokes`.
+
+    Layouts are kept in a bounded LRU cache keyed by `(line, font, alignment)`, as font sizes only differ by a pending
+    scaling. Hence, repeated lines, e.g. type lines and mana costs, are only laid out once per process. Hits and misses
+    are reported by `layout_line.cache_info()`.
+
+    Returns
+    -------
+    StrokeGroup
+        Strokes of the line, whose points are shared with the cache and read-only.
+    """
+    return scale(_cached_layout(line, font, alignment), font_size / 21)
+
+
+layout_line.cache_info = _cached_layout.cache_info
+layout_line.cache_clear = _cached_layout.cache_clear
+
+
+@lru_cache(maxsize=4096)
+def _line_metrics(line, font):
+    tokens = _tokens(line)
+    advance, ink = np.zeros(len(tokens)), np.zeros((len(tokens), 2, 2))
+    chars = [i for i, c in enumerate(tokens) if c[0] != '{']
+    advance[chars], ink[chars] = metrics_by_char(''.join(tokens[i] for i in chars), font)
+    for i, c in enumerate(tokens):
+        if c[0] == '{':
+            if c not in special_metrics:
+                raise ValueError('Unknown special sequence %s' % c)
+            advance[i], ink[i] = special_metrics[c]
+    breakable = np.array([c == ' ' for c in tokens], dtype=bool)
+    for array in (advance, ink, breakable):
+        array.flags.writeable = False
+    return tokens, advance, ink, breakable
+
+
+def measure_line(line, font_size=21, alignment='left', font='rowmans'):
+    """
+    Computes the bounding box of `layout_line` from glyph metrics, i.e. without laying out the line.
+
+    Returns
+    -------
+    ndarray (2, 2)
+        where first dimension is min/max and the second is x/y. NaN if the line has no ink.
+    """
+    _, advance, ink, _ = _line_metrics(line, font)
+    return measure_glyphs(advance, ink, font_size=font_size, alignment=alignment)
+
+
+def wrap_line(line, max_width, font_size=21, font='rowmans'):
+    """
+    Wraps a line of text including special sequences at spaces into lines, whose strokes are at most `max_width` wide,
+    see `pen_plots.fonts.break_glyphs`.
+
+    Returns
+    -------
+    list of str
+    """
+    tokens, advance, ink, breakable = _line_metrics(line, font)
+    return [''.join(tokens[start:end]) for start, end in break_glyphs(advance, ink, breakable, max_width, font_size)]
@@ -2,62 +2,510 @@
 # The assumed data structure of the problem is a list of states.
 # Each state consists of a list of cities.
 # Each city is a tuple of a start and an end point.
-# The edge weights are endcoded as the eucledian distance between end and start points.
+# The edge weights are endcoded as the eucledian distance between end and start points, unless a different cost model
+# is passed, see `pen_plots.optimization.cost_models`.
 # E.g. tsp[state_idx][city_idx][0] is the start point of city_idx in state_idx.
+# Alternatively, problems may be given as `FlatAGTSP`, which stores all cities in contiguous arrays.
 # Returned solutions are index lists, consistign of state_idx and city_idx of visited cities in order.
 
+import time
 import numpy as np
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pen_plots.optimization.cost_models import euclidean
+from pen_plots.optimization.spatial import GridIndex, k_nearest
 
+# Flattened problem. Start and end points of all cities are stored in arrays `starts` and `ends` of shape (N_cities, 2).
+# The cities of state i are stored at indices offsets[i] to offsets[i + 1] (exclusive).
+FlatAGTSP = namedtuple("FlatAGTSP", ["starts", "ends", "offsets"])
 
-def cost(tsp, sol):
+
+def flatten(tsp):
+    """
+    Converts a problem given as list of states to a `FlatAGTSP`. Flat problems are returned unchanged.
+    """
+    if isinstance(tsp, FlatAGTSP):
+        return tsp
+    return FlatAGTSP(
+        starts=np.array([city[0] for state in tsp for city in state], dtype=float).reshape(-1, 2),
+        ends=np.array([city[1] for state in tsp for city in state], dtype=float).reshape(-1, 2),
+        offsets=np.concatenate([[0], np.cumsum([len(state) for state in tsp])]).astype(int),
+    )
+
+
+def state_of_cities(tsp):
+    """
+    Returns the state index of each city of a `FlatAGTSP`.
+    """
+    return np.repeat(np.arange(len(tsp.offsets) - 1), np.diff(tsp.offsets))
+
+
+def cost(tsp, sol, cost_model=euclidean):
     """
     Computes the cost, i.e. total length of a solution `sol` to a Asymmetric Generalized Traveling Salesman Problem `tsp`.
+
+    Parameters
+    ----------
+    tsp : list of states or FlatAGTSP
+        Problem. Pass a `FlatAGTSP` to avoid flattening on each call.
+    sol : ndarray (N, 2) or (B, N, 2)
+        Solution or batch of `B` solutions.
+    cost_model : callable
+        Edge weights, see `pen_plots.optimization.cost_models`. Defaults to euclidean distance.
+
+    Returns
+    -------
+    float or ndarray (B,)
+        Cost of each solution.
     """
-    cost = 0
-    for i in range(1, len(tsp)):
-        cost += np.linalg.norm(tsp[sol[i, 0]][sol[i, 1]][0] - tsp[sol[i - 1, 0]][sol[i - 1, 1]][1])
-    return cost
+    tsp = flatten(tsp)
+    sol = np.asarray(sol)
+    cities = tsp.offsets[sol[..., 0]] + sol[..., 1]
+    return np.sum(cost_model(tsp.ends[cities[..., :-1]], tsp.starts[cities[..., 1:]]), axis=-1)
 
 
-def random(tsp):
+def random(tsp, rng=None):
     """
     Computes a random solution to the Asymmetric Generalized Traveling Salesman Problem.
 
     This solution is hardly optimal.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        Source of randomness. Defaults to the global numpy random state.
     """
-    sol = np.empty((len(tsp), 2), dtype=int)
-    for i, state in enumerate(np.random.permutation(len(tsp))):
-        sol[i, 0] = state
-        sol[i, 1] = np.random.randint(len(tsp[state]))
+    rng = np.random if rng is None else rng
+    tsp = flatten(tsp)
+    sizes = np.diff(tsp.offsets)
+    sol = np.empty((len(sizes), 2), dtype=int)
+    sol[:, 0] = rng.permutation(len(sizes))
+    sol[:, 1] = np.floor(rng.random(len(sizes)) * sizes[sol[:, 0]])
     return sol
 
 
-def greedy(tsp, start_point=(0, 0)):
+def greedy(tsp, start_point=(0, 0), method='scan'):
     """
     Computes a greedy solution to the Asymmetric Generalized Traveling Salesman Problem.
 
-    Starts with the city closest to `start_point`.
+    Starts with the city closest to `start_point`. Always moves to the closest city, which is also the cheapest one
+    for any cost model increasing with distance.
+
+    Parameters
+    ----------
+    method : {'scan', 'grid'}
+        How to find the closest city. 'scan' compares against all cities in each step, which takes O(N^2) in total.
+        'grid' uses a spatial index and removes visited states from it, which takes roughly O(N log N). Both yield the
+        same solution.
     """
-    # Create list of all starting points
-    N_cities = np.sum([len(state) for state in tsp])
-    points = np.empty((N_cities, len(start_point)), dtype=float)
-    points_meta = np.empty((N_cities, len(start_point)), dtype=int)
-    i = 0
-    for state_idx, state in enumerate(tsp):
-        for city_idx, city in enumerate(state):
-            points[i] = city[0]
-            points_meta[i] = (state_idx, city_idx)
-            i += 1
+    tsp = flatten(tsp)
+    state_of = state_of_cities(tsp)
+    N = len(tsp.offsets) - 1
+
+    if method == 'grid':
+        return _greedy_grid(tsp, start_point, state_of)
+    elif method != 'scan':
+        raise ValueError("Unknown method '%s'" % method)
 
+    points = tsp.starts.copy()
     pos = start_point
-    sol = np.empty((len(tsp), 2), dtype=int)
-    for i in range(len(tsp)):
+    sol = np.empty((N, 2), dtype=int)
+    for i in range(N):
         # Find clostest starting point
-        state_idx, city_idx = points_meta[np.argmin(np.sum(np.square(points - pos), axis=-1))]
-        sol[i] = state_idx, city_idx
-        pos = tsp[state_idx][city_idx][1]
+        city = np.argmin(np.sum(np.square(points - pos), axis=-1))
+        state_idx = state_of[city]
+        sol[i] = state_idx, city - tsp.offsets[state_idx]
+        pos = tsp.ends[city]
 
         # Set all points of covered state to inf to prevent visiting again
-        points[points_meta[:, 0] == state_idx, :] = np.inf
+        points[tsp.offsets[state_idx]:tsp.offsets[state_idx + 1]] = np.inf
+
+    return sol
+
+
+def _greedy_grid(tsp, start_point, state_of):
+    """
+    Greedy solution using a `GridIndex` for nearest neighbour queries.
+    """
+    index = GridIndex(tsp.starts)
+
+    pos = start_point
+    sol = np.empty((len(tsp.offsets) - 1, 2), dtype=int)
+    for i in range(len(sol)):
+        city = index.nearest(pos)
+        state_idx = state_of[city]
+        sol[i] = state_idx, city - tsp.offsets[state_idx]
+        pos = tsp.ends[city]
+
+        # Remove all points of covered state to prevent visiting again
+        index.remove(np.arange(tsp.offsets[state_idx], tsp.offsets[state_idx + 1]))
 
     return sol
+
+
+def improve(tsp, sol, start_point=None, n_neighbours=8, max_iterations=None, time_limit=None, cost_model=euclidean):
+    """
+    Improves a solution to the Asymmetric Generalized Traveling Salesman Problem by local search.
+
+    Repeatedly applies the following moves as long as they reduce the cost:
+
+    * re-choosing the city of each state, e.g. the entry point of a closed loop or the direction of a stroke,
+    * 2-opt, i.e. reversing a section of the tour,
+    * Or-opt, i.e. moving a section of up to three states to another position, optionally reversed.
+
+    Reversing a section requires each visited city to have a reverse city within its state, i.e. a city with swapped
+    start and end point. If any city lacks one, reversing moves are disabled. Moves are only searched among the
+    `n_neighbours` closest states of each state, with cost deltas computed from the changed edges only.
+
+    Parameters
+    ----------
+    sol : ndarray (N, 2)
+        Initial solution, e.g. from `greedy`.
+    start_point : array_like (2,)
+        Fixed position preceding the first city. Defaults to none, i.e. the tour may start anywhere.
+    n_neighbours : int
+        Number of neighbours per state end point considered for moves.
+    max_iterations : int
+        Maximum number of rounds, where each round consists of city re-choice followed by 2-opt/Or-opt until no
+        improvement is found. Defaults to unlimited.
+    time_limit : seconds
+        Stops after the first move exceeding the time limit. Defaults to unlimited. Note that the result then depends
+        on the machine speed.
+    cost_model : callable
+        Edge weights, see `pen_plots.optimization.cost_models`. Defaults to euclidean distance.
+
+    Returns
+    -------
+    ndarray (N, 2)
+        Improved solution.
+    """
+    search = _LocalSearch(tsp, sol, start_point, n_neighbours, cost_model)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        iteration += 1
+        improved = search.rechoose_cities()
+        improved = search.exchange(deadline) or improved
+        if not improved or deadline is not None and time.perf_counter() > deadline:
+            break
+
+    return search.solution()
+
+
+class _LocalSearch():
+    """
+    State of the local search of `improve`.
+
+    The tour is stored as array of global city indices into the flattened arrays `starts` and `ends`. A start point is
+    stored as additional city `depot` preceding the tour.
+    """
+
+    def __init__(self, tsp, sol, start_point, n_neighbours, cost_model):
+        tsp = flatten(tsp)
+        self.cost_model = cost_model
+        self.offsets = tsp.offsets
+        self.state_of = state_of_cities(tsp)
+        self.starts, self.ends = tsp.starts, tsp.ends
+
+        # Find reverse city of each city
+        self.reverse = np.full(len(self.starts), -1)
+        closed = np.all(self.starts == self.ends, axis=-1)
+        self.reverse[closed] = np.flatnonzero(closed)
+        by_points = {
+            (self.state_of[c], self.starts[c].tobytes(), self.ends[c].tobytes()): c
+            for c in np.flatnonzero(~closed)
+        }
+        for c in np.flatnonzero(~closed):
+            self.reverse[c] = by_points.get((self.state_of[c], self.ends[c].tobytes(), self.starts[c].tobytes()), -1)
+        self.reversible = np.all(self.reverse >= 0)
+
+        self.depot = -1
+        if start_point is not None:
+            self.depot = len(self.starts)
+            self.starts = np.concatenate([self.starts, [start_point]])
+            self.ends = np.concatenate([self.ends, [start_point]])
+
+        self.tour = self.offsets[sol[:, 0]] + sol[:, 1]
+        self.pos = np.empty(len(self.tour), dtype=int)
+        self.pos[self.state_of[self.tour]] = np.arange(len(self.tour))
+
+        # Neighbour states of both end points of each state's city
+        N = len(self.tour)
+        states = self.state_of[self.tour]
+        neighbours = k_nearest(
+            np.concatenate([self.starts[self.tour], self.ends[self.tour]]),
+            n_neighbours,
+            groups=np.concatenate([states, states]),
+        )
+        neighbour_states = np.where(neighbours >= 0, np.concatenate([states, states])[neighbours], -1)
+        self.neighbours = np.empty((N, 2 * n_neighbours), dtype=int)
+        self.neighbours[states] = np.concatenate([neighbour_states[:N], neighbour_states[N:]], axis=1)
+
+    def solution(self):
+        state_idx = self.state_of[self.tour]
+        return np.stack([state_idx, self.tour - self.offsets[state_idx]], axis=-1)
+
+    def _edge_cost(self, a, b):
+        """
+        Costs of the edges from cities `a` to cities `b`. Missing cities, marked by -1, cause zero cost.
+        """
+        return self.cost_model(self.ends[a], self.starts[b]) * ((a >= 0) & (b >= 0))
+
+    def _at(self, positions):
+        """
+        Returns cities at `positions` of the tour. Positions before the tour yield the depot, positions after -1.
+        """
+        positions = np.asarray(positions)
+        cities = np.array(self.tour[positions % len(self.tour)])
+        cities[positions < 0] = self.depot
+        cities[positions >= len(self.tour)] = -1
+        return cities
+
+    def rechoose_cities(self):
+        """
+        Chooses the best city for each state given its neighbours in the tour. Positions of equal parity don't affect
+        each other, so each parity is optimized at once.
+
+        Returns
+        -------
+        bool
+            whether the tour was improved.
+        """
+        N = len(self.tour)
+        improved = False
+        for parity in range(2):
+            positions = np.arange(parity, N, 2)
+            states = self.state_of[self.tour[positions]]
+            sizes = self.offsets[states + 1] - self.offsets[states]
+            if np.all(sizes <= 1):
+                continue
+
+            # Enumerate all cities of these states
+            group = np.repeat(np.arange(len(positions)), sizes)
+            group_start = np.cumsum(sizes) - sizes
+            cities = np.repeat(self.offsets[states], sizes) + np.arange(len(group)) - np.repeat(group_start, sizes)
+            prev = self._at(positions - 1)[group]
+            next = self._at(positions + 1)[group]
+
+            costs = self._edge_cost(prev, cities) + self._edge_cost(cities, next)
+            best = np.lexsort((costs, group))[group_start]
+            current = self.tour[positions]
+            current_costs = self._edge_cost(prev[group_start], current) + self._edge_cost(current, next[group_start])
+
+            change = costs[best] < current_costs - 1e-9
+            if np.any(change):
+                self.tour[positions[change]] = cities[best[change]]
+                improved = True
+        return improved
+
+    def _reversal_delta(self, i, j):
+        """
+        Cost deltas of reversing sections from positions `i` to `j` (inclusive).
+        """
+        first, last = self.tour[i], self.tour[j]
+        prev, next = self._at(i - 1), self._at(j + 1)
+        # The reversed section starts with the reverse of `last` and ends with the reverse of `first`
+        added = self._edge_cost(prev, self.reverse[last]) + self._edge_cost(self.reverse[first], next)
+        return added - self._edge_cost(prev, first) - self._edge_cost(last, next)
+
+    def _reverse(self, i, j):
+        self.tour[i:j + 1] = self.reverse[self.tour[i:j + 1]][::-1]
+        self.pos[self.state_of[self.tour[i:j + 1]]] = np.arange(i, j + 1)
+
+    def _try_two_opt(self, p):
+        """
+        Tries to reverse a section adjacent to an edge at position `p`. Returns changed positions or None.
+        """
+        N = len(self.tour)
+        candidates = []
+        if p > 0:  # Section starting at p
+            q = self.pos[self.neighbours[self.state_of[self.tour[p - 1]]]]
+            q = np.append(q[(self.neighbours[self.state_of[self.tour[p - 1]]] >= 0) & (q >= p)], N - 1)
+            candidates.append((np.full_like(q, p), q))
+        if p < N - 1:  # Section ending at p
+            q = self.pos[self.neighbours[self.state_of[self.tour[p + 1]]]]
+            q = np.append(q[(self.neighbours[self.state_of[self.tour[p + 1]]] >= 0) & (q <= p)], 0)
+            candidates.append((q, np.full_like(q, p)))
+        if len(candidates) == 0:
+            return None
+        i = np.concatenate([c[0] for c in candidates])
+        j = np.concatenate([c[1] for c in candidates])
+
+        delta = self._reversal_delta(i, j)
+        best = np.argmin(delta)
+        if delta[best] < -1e-9:
+            self._reverse(i[best], j[best])
+            return [i[best] - 1, i[best], j[best], j[best] + 1]
+        return None
+
+    def _try_or_opt(self, p):
+        """
+        Tries to move a section of up to three states starting at position `p`. Returns changed positions or None.
+        """
+        N = len(self.tour)
+        lengths = np.arange(1, min(3, N - p, N - 1) + 1)
+        if len(lengths) == 0:
+            return None
+        first, last = self.tour[p], self.tour[p + lengths - 1]
+        prev, next = self._at(p - 1), self._at(p + lengths)
+        removal_gain = self._edge_cost(prev, first) + self._edge_cost(last, next) - self._edge_cost(prev, next)
+
+        # Insert next to neighbours of the section's ends
+        states = np.concatenate(
+            [
+                np.broadcast_to(self.neighbours[self.state_of[first]], (len(lengths), self.neighbours.shape[1])),
+                self.neighbours[self.state_of[last]],
+            ],
+            axis=1,
+        )
+        length = np.broadcast_to(lengths[:, None], states.shape)[states >= 0]
+        section = np.broadcast_to(np.arange(len(lengths))[:, None], states.shape)[states >= 0]
+        q = self.pos[states[states >= 0]]
+        outside = (q < p) | (q >= p + length)
+        q, length, section = q[outside], length[outside], section[outside]
+
+        # Gaps are given by the positions before and after the gap within the tour without the section
+        gap_before = np.concatenate([q, q - 1])
+        length, section = np.tile(length, 2), np.tile(section, 2)
+        gap_before = np.where((gap_before >= p) & (gap_before < p + length), p - 1, gap_before)
+        gap_after = gap_before + 1
+        gap_after = np.where((gap_after >= p) & (gap_after < p + length), p + length, gap_after)
+        mask = gap_before != p - 1
+        gap_before, gap_after, length, section = gap_before[mask], gap_after[mask], length[mask], section[mask]
+        if len(gap_before) == 0:
+            return None
+        a, b = self._at(gap_before), self._at(gap_after)
+
+        directions = [False, True] if self.reversible else [False]
+        head = np.concatenate([self.reverse[last[section]] if r else np.full_like(section, first) for r in directions])
+        tail = np.concatenate([np.full_like(section, self.reverse[first]) if r else last[section] for r in directions])
+        a, b = np.tile(a, len(directions)), np.tile(b, len(directions))
+        added = self._edge_cost(a, head) + self._edge_cost(tail, b)
+        delta = added - self._edge_cost(a, b) - np.tile(removal_gain[section], len(directions))
+        best = np.argmin(delta)
+        if delta[best] >= -1e-9:
+            return None
+
+        reversed = best >= len(section)
+        best %= len(section)
+        length, gap_after = length[best], gap_after[best]
+        moved = self.tour[p:p + length]
+        if reversed:
+            moved = self.reverse[moved][::-1]
+        rest = np.delete(self.tour, np.arange(p, p + length))
+        insert_at = gap_after if gap_after < p else gap_after - length
+        self.tour = np.insert(rest, insert_at, moved)
+        self.pos[self.state_of[self.tour]] = np.arange(N)
+        return [p - 1, p, insert_at - 1, insert_at, insert_at + length - 1, insert_at + length]
+
+    def exchange(self, deadline=None):
+        """
+        Applies 2-opt and Or-opt moves until no further improvement is found. States are processed from a queue,
+        states adjacent to changed edges are queued again.
+
+        Returns
+        -------
+        bool
+            whether the tour was improved.
+        """
+        N = len(self.tour)
+        queue = deque(self.state_of[self.tour])
+        queued = np.ones(N, dtype=bool)
+        improved = False
+        while len(queue) > 0:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            state = queue.popleft()
+            queued[state] = False
+
+            p = self.pos[state]
+            changed = self._try_two_opt(p) if self.reversible else None
+            if changed is None:
+                changed = self._try_or_opt(p)
+            if changed is not None:
+                improved = True
+                for position in changed:
+                    if 0 <= position < N:
+                        s = self.state_of[self.tour[position]]
+                        if not queued[s]:
+                            queued[s] = True
+                            queue.append(s)
+        return improved
+
+
+# Problem and parameters of `multi_start` worker processes. Set once per worker by `_init_worker`.
+_worker_args = None
+
+
+def _init_worker(tsp, start_point, initial, kwargs):
+    global _worker_args
+    _worker_args = (tsp, start_point, initial, kwargs)
+
+
+def _solve_start(k, seed):
+    """
+    Solves the problem of the worker from the `k`-th start, randomized by `seed`.
+    """
+    tsp, start_point, initial, kwargs = _worker_args
+    rng = np.random.default_rng(seed)
+    if k == 0:  # First start is the plain greedy solution
+        sol = greedy(tsp, start_point, method='grid')
+    elif initial == 'greedy':  # Begin with a random city
+        sol = greedy(tsp, tsp.starts[rng.integers(len(tsp.starts))], method='grid')
+    elif initial == 'random':
+        sol = random(tsp, rng)
+    else:
+        raise ValueError("Unknown initial solution '%s'" % initial)
+    sol = improve(tsp, sol, start_point, **kwargs)
+    return sol, _cost_from(tsp, sol, start_point, kwargs.get('cost_model', euclidean))
+
+
+def _cost_from(tsp, sol, start_point, cost_model):
+    """
+    Cost of a solution including the travel from `start_point` to the first city.
+    """
+    first = tsp.offsets[sol[0, 0]] + sol[0, 1]
+    return cost(tsp, sol, cost_model) + cost_model(np.asarray(start_point, dtype=float), tsp.starts[first])
+
+
+def multi_start(tsp, n_starts=8, start_point=(0, 0), initial='greedy', seed=None, max_workers=None, **kwargs):
+    """
+    Solves the Asymmetric Generalized Traveling Salesman Problem from multiple starts in parallel and returns the best
+    solution.
+
+    The first start is the greedy solution beginning at `start_point`. All further starts are greedy solutions
+    beginning at a random city or random solutions. Each is improved by local search. Starts are distributed across a
+    process pool. The problem is passed to each worker once when it is started instead of with each start.
+
+    Parameters
+    ----------
+    n_starts : int
+        Number of starts.
+    start_point : array_like (2,)
+        Position preceding the tour. Costs include the travel from there to the first city.
+    initial : {'greedy', 'random'}
+        Initial solution of randomized starts.
+    seed : int
+        Seed for randomized starts. Results are deterministic for a given seed, unless `time_limit` is passed to the
+        local search.
+    max_workers : int
+        Number of worker processes. Defaults to the number of processors.
+    kwargs
+        Passed to `improve`, e.g. `cost_model`. Cost models must be picklable.
+
+    Returns
+    -------
+    ndarray (N, 2)
+        Best solution. Ties are resolved in favour of the earlier start.
+    """
+    tsp = flatten(tsp)
+    seeds = np.random.SeedSequence(seed).spawn(n_starts)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(tsp, start_point, initial, kwargs),
+    ) as executor:
+        results = list(executor.map(_solve_start, range(n_starts), seeds))
+
+    return results[int(np.argmin([c for _, c in results]))][0]
@@ -0,0 +1,51 @@
+"""
+This module provides cost models for the travel between strokes, i.e. the edge weights of the Asymmetric Generalized
+Traveling Salesman Problem.
+
+A cost model is a callable receiving arrays of end points and start points with shape (..., 2) and returning the cost of
+travelling from each end point to the corresponding start point. Cost models must only depend on the distance between
+both points, as reversing sections of a tour must not change its cost.
+"""
+import numpy as np
+
+
+def euclidean(ends, starts):
+    """
+    Travel distance in mm.
+    """
+    d = starts - ends
+    return np.sqrt(np.einsum('...i,...i->...', d, d))
+
+
+class TravelTime():
+    """
+    Estimated travel time in seconds, based on the same parameters as `write_gcode`.
+
+    Each travel move consists of lifting the pen, moving at `feedrate_travel` and lowering the pen. Gaps shorter than
+    `min_lift_distance` are bridged with the pen down at `feedrate_draw` instead, skipping both z-hop moves.
+    Accelerations are neglected.
+
+    Parameters
+    ----------
+    feedrate_draw/feedrate_travel/feedrate_z_hop : mm/min
+        Feedrates used for plotting.
+    z_hop : mm
+        z-hop distance.
+    min_lift_distance : mm
+        Gaps shorter than this are bridged without lifting the pen. Defaults to 0, i.e. always lift the pen.
+    """
+
+    def __init__(self, feedrate_draw=1800, feedrate_travel=3600, feedrate_z_hop=300, z_hop=2, min_lift_distance=0):
+        self.feedrate_draw = feedrate_draw
+        self.feedrate_travel = feedrate_travel
+        self.feedrate_z_hop = feedrate_z_hop
+        self.z_hop = z_hop
+        self.min_lift_distance = min_lift_distance
+
+    def __call__(self, ends, starts):
+        d = euclidean(ends, starts)
+        return np.where(
+            d < self.min_lift_distance,
+            d / (self.feedrate_draw / 60),
+            d / (self.feedrate_travel / 60) + 2 * self.z_hop / (self.feedrate_z_hop / 60),
+        )
@@ -0,0 +1,223 @@
+"""
+This module provides spatial indices for fast proximity queries on two-dimensional points.
+"""
+import numpy as np
+
+
+class GridIndex():
+    """
+    Uniform grid over a static set of points. Supports nearest neighbour queries and removal of points.
+
+    Queries only visit the grid cells around the query position, so a nearest neighbour query costs roughly O(1) for
+    evenly distributed points instead of O(N) for a full scan.
+
+    Parameters
+    ----------
+    points : array_like (N, 2)
+        Indexed points.
+    cell_size : float
+        Edge length of grid cells. Defaults to a size resulting in about `points_per_cell` points per cell.
+    points_per_cell : float
+        Average number of points per cell used to determine the default `cell_size`.
+    """
+
+    def __init__(self, points, cell_size=None, points_per_cell=2):
+        self.points = np.asarray(points, dtype=float)
+        N = len(self.points)
+
+        self.origin = np.min(self.points, axis=0) if N > 0 else np.zeros(2)
+        extent = np.max(self.points, axis=0) - self.origin if N > 0 else np.zeros(2)
+        if cell_size is None:
+            # Lower bound for points distributed along a line
+            cell_size = max(
+                np.sqrt(points_per_cell * extent[0] * extent[1] / max(N, 1)),
+                np.max(extent) * points_per_cell / max(N, 1),
+            )
+            if cell_size <= 0:  # All points are identical
+                cell_size = 1
+        self.cell_size = cell_size
+        # Derived from the cells of the points, as `extent // cell_size` may differ from them by rounding
+        self.shape = np.max(self._cell(self.points), axis=0) + 1 if N > 0 else np.ones(2, dtype=int)
+
+        # Sort points by cell, points in the same cell remain sorted by index
+        self.cell_of = self._cell_id(self._cell(self.points))
+        self.order = np.argsort(self.cell_of, kind='stable')
+        self.cell_start = np.searchsorted(self.cell_of[self.order], np.arange(np.prod(self.shape) + 1))
+
+        self.alive = np.ones(N, dtype=bool)
+        self.n_alive = N
+        self.cell_alive = np.bincount(self.cell_of, minlength=np.prod(self.shape))
+        self._alive_idx = np.arange(N)
+        self._ring_offsets = {}
+
+    def _cell(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(int)
+
+    def _cell_id(self, cells):
+        return cells[..., 0] * self.shape[1] + cells[..., 1]
+
+    def remove(self, idx):
+        """
+        Removes the points with indices `idx` from the index. Removing points twice has no effect.
+        """
+        idx = np.asarray(idx, dtype=int).reshape(-1)
+        idx = idx[self.alive[idx]]
+        self.alive[idx] = False
+        self.n_alive -= len(idx)
+        np.subtract.at(self.cell_alive, self.cell_of[idx], 1)
+
+    def _ring(self, center, r):
+        """
+        Returns ids of all cells with a Chebyshev distance of `r` to cell `center`, which lie within the grid.
+        """
+        offsets = self._ring_offsets.get(r)
+        if offsets is None:
+            span = np.arange(-r, r + 1)
+            inner = span[1:-1]
+            offsets = np.concatenate(
+                [
+                    np.stack([span, np.full_like(span, -r)], axis=-1),
+                    np.stack([span, np.full_like(span, r)], axis=-1),
+                    np.stack([np.full_like(inner, -r), inner], axis=-1),
+                    np.stack([np.full_like(inner, r), inner], axis=-1),
+                ]
+            ) if r > 0 else np.zeros((1, 2), dtype=int)
+            self._ring_offsets[r] = offsets
+        cells = offsets + center
+        if r > 0 and (np.any(center - r < 0) or np.any(center + r >= self.shape)):  # Ring exceeds grid
+            cells = cells[(
+                (cells[:, 0] >= 0) & (cells[:, 0] < self.shape[0]) & (cells[:, 1] >= 0) & (cells[:, 1] < self.shape[1])
+            )]
+        return cells[:, 0] * self.shape[1] + cells[:, 1]
+
+    def _closest(self, candidates, pos):
+        """
+        Returns the candidate closest to `pos` and its squared distance. Ties are broken by the lower index.
+        """
+        d = np.sum(np.square(self.points[candidates] - pos), axis=-1)
+        i = np.lexsort((candidates, d))[0]
+        return candidates[i], d[i]
+
+    def _nearest_brute_force(self, pos):
+        if len(self._alive_idx) > 2 * self.n_alive:  # Compact list of remaining points
+            self._alive_idx = self._alive_idx[self.alive[self._alive_idx]]
+        return self._closest(self._alive_idx[self.alive[self._alive_idx]], pos)[0]
+
+    def nearest(self, pos):
+        """
+        Returns the index of the remaining point closest to `pos`.
+
+        Yields the same result as `np.argmin` over the squared distances to all remaining points, i.e. ties are broken
+        by the lower index.
+
+        Raises
+        ------
+        ValueError
+            when no points are remaining.
+        """
+        if self.n_alive <= 0:
+            raise ValueError("No points remaining in index")
+
+        center = self._cell(np.asarray(pos, dtype=float))
+        # Chebyshev distance of the center cell to the grid
+        r = max(0, np.max(-center), np.max(center - self.shape + 1))
+        r_max = max(np.max(center), np.max(self.shape - 1 - center))
+
+        best, best_d = None, np.inf
+        visited = 0
+        while r <= r_max:
+            cells = self._ring(center, r)
+            visited += len(cells)
+            if visited > 2 * self.n_alive + 16:  # Grid is sparse, scanning remaining points is cheaper
+                return self._nearest_brute_force(pos)
+
+            cells = cells[self.cell_alive[cells] > 0]
+            if len(cells) > 0:
+                candidates = np.concatenate([self.order[self.cell_start[c]:self.cell_start[c + 1]] for c in cells])
+                candidates = candidates[self.alive[candidates]]
+                i, d = self._closest(candidates, pos)
+                if d < best_d or d == best_d and i < best:
+                    best, best_d = i, d
+
+            # Points in outer rings are at least r cells away
+            if best is not None and r > 0 and best_d < ((r - 1e-6) * self.cell_size)**2:
+                break
+            r += 1
+
+        return best
+
+
+def k_nearest(points, k, groups=None):
+    """
+    Computes the `k` nearest neighbours for each point.
+
+    Neighbours are searched in growing square windows of grid cells around each point. A window of r cells contains all
+    points within a distance of r cells, so points are done once their k-th neighbour lies within that distance. Runs in
+    O(N k) vectorized for evenly distributed points.
+
+    Parameters
+    ----------
+    points : array_like (N, 2)
+        Points to be searched.
+    k : int
+        Number of neighbours.
+    groups : array_like (N,)
+        Group label of each point. Points of the same group are never neighbours of each other. Defaults to each point
+        being its own group.
+
+    Returns
+    -------
+    ndarray (N, k)
+        of neighbour indices sorted by distance, where ties are broken by the lower index. Padded with -1 if less than
+        `k` neighbours exist.
+    """
+    points = np.asarray(points, dtype=float)
+    N = len(points)
+    groups = np.arange(N) if groups is None else np.asarray(groups)
+    neighbours = np.full((N, k), -1, dtype=int)
+    if N == 0 or k == 0:
+        return neighbours
+
+    index = GridIndex(points, points_per_cell=max(k / 3, 1))
+    query_cells = index._cell(points)
+
+    pending = np.arange(N)
+    r = 1
+    while len(pending) > 0:
+        # Enumerate all pairs of pending points and points within a window of cells
+        pairs_q, pairs_p = [], []
+        for dx in range(-r, r + 1):
+            for dy in range(-r, r + 1):
+                cells = query_cells[pending] + [dx, dy]
+                valid = np.all((cells >= 0) & (cells < index.shape), axis=-1)
+                cell_ids = index._cell_id(cells[valid])
+                counts = index.cell_start[cell_ids + 1] - index.cell_start[cell_ids]
+                first = np.repeat(index.cell_start[cell_ids], counts)
+                within = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts)
+                pairs_q.append(np.repeat(pending[valid], counts))
+                pairs_p.append(index.order[first + within])
+        pairs_q, pairs_p = np.concatenate(pairs_q), np.concatenate(pairs_p)
+        mask = groups[pairs_q] != groups[pairs_p]
+        pairs_q, pairs_p = pairs_q[mask], pairs_p[mask]
+
+        # Keep k closest per point
+        d = np.sum(np.square(points[pairs_q] - points[pairs_p]), axis=-1)
+        order = np.lexsort((pairs_p, d, pairs_q))
+        pairs_q, pairs_p = pairs_q[order], pairs_p[order]
+        group_start = np.searchsorted(pairs_q, pairs_q, side='left')
+        rank = np.arange(len(pairs_q)) - group_start
+        keep = rank < k
+        neighbours[pairs_q[keep], rank[keep]] = pairs_p[keep]
+
+        # Continue with larger window for points which lack neighbours or may have closer ones outside of the window,
+        # unless the window covers the whole grid
+        if r >= np.max(index.shape):
+            break
+        kth = neighbours[pending, -1]
+        d_kth = np.sum(np.square(points[pending] - points[kth]), axis=-1)
+        cell_position = (points[pending] - index.origin) / index.cell_size - query_cells[pending]
+        reach = (r + np.min(np.minimum(cell_position, 1 - cell_position), axis=-1)) * index.cell_size
+        pending = pending[(kth < 0) | (d_kth > reach**2)]
+        r *= 2
+
+    return neighbours
@@ -0,0 +1,286 @@
+"""
+This module estimates plot times by simulating the motion planner of the plotter firmware.
+"""
+import re
+import numpy as np
+from collections import namedtuple
+from pen_plots.strokes import StrokeBuffer, StrokeGroup
+
+# Kinds of moves
+_DRAW, _TRAVEL, _LIFT = range(3)
+
+
+class PlotTime(namedtuple('PlotTime', ['draw', 'travel', 'lift'])):
+    """
+    Estimated plot time in seconds, broken down into drawing moves, travel moves and pen lifts.
+    """
+    __slots__ = ()
+
+    @property
+    def total(self):
+        return self.draw + self.travel + self.lift
+
+
+def simulate_moves(path, feedrates, acceleration=1000, junction_deviation=0.013):
+    """
+    Computes the duration of consecutive linear moves with trapezoidal velocity profiles.
+
+    The planner follows Grbl and Marlin: Speeds at junctions are limited by the junction deviation, i.e. the radius
+    of a virtual arc through the corner, and by the feedrates of both moves. The machine starts and stops at rest.
+    Entry speeds are limited such that each move can decelerate to the next one and accelerate from the previous one.
+    Both passes are computed for all moves at once as prefix and suffix minima of squared speeds.
+
+    Parameters
+    ----------
+    path : ndarray (M + 1, D)
+        Positions visited in order.
+    feedrates : ndarray (M,)
+        Nominal feedrate of each move in mm/min.
+    acceleration : mm/s^2
+        Acceleration of all axes.
+    junction_deviation : mm
+        Junction deviation of the planner. Zero stops at every corner.
+
+    Returns
+    -------
+    ndarray (M,)
+        Duration of each move in seconds. Moves of length zero take no time.
+    """
+    d = np.diff(np.asarray(path, dtype=float), axis=0)
+    length = np.sqrt(np.sum(np.square(d), axis=-1))
+    durations = np.zeros(len(d))
+    moves = np.flatnonzero(length > 0)
+    if len(moves) == 0:
+        return durations
+    length, speed = length[moves], np.asarray(feedrates, dtype=float)[moves] / 60
+    unit = d[moves] / length[:, np.newaxis]
+
+    # Maximum squared speed at the junctions between moves
+    cos_theta = -np.sum(unit[:-1] * unit[1:], axis=-1)
+    sin_half_theta = np.sqrt(np.clip(0.5 * (1 - cos_theta), 0, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        junction = np.where(
+            sin_half_theta < 1, acceleration * junction_deviation * sin_half_theta / (1 - sin_half_theta), np.inf
+        )
+    junction = np.minimum(junction, np.square(np.minimum(speed[:-1], speed[1:])))
+    junction = np.concatenate([[0], junction, [0]])
+
+    # Squared speed changes by at most 2 a L over a move. The backward pass limits each entry speed by the reachable
+    # speeds of all later junctions, the forward pass by the reachable speeds of all earlier ones.
+    reach = np.concatenate([[0], np.cumsum(2 * acceleration * length)])
+    entry = np.minimum.accumulate((junction + reach)[::-1])[::-1] - reach
+    entry = np.maximum(np.minimum.accumulate(entry - reach) + reach, 0)
+    v_entry, v_exit = np.sqrt(entry[:-1]), np.sqrt(entry[1:])
+
+    # Trapezoids, which don't reach the nominal speed, become triangles
+    accelerating = (np.square(speed) - entry[:-1]) / (2 * acceleration)
+    decelerating = (np.square(speed) - entry[1:]) / (2 * acceleration)
+    cruising = length - accelerating - decelerating
+    peak = np.where(cruising >= 0, speed, np.sqrt(np.maximum(acceleration * length + (entry[:-1] + entry[1:]) / 2, 0)))
+    durations[moves] = (2 * peak - v_entry - v_exit) / acceleration + np.maximum(cruising, 0) / speed
+    return durations
+
+
+def _breakdown(durations, kinds):
+    return PlotTime(*np.bincount(kinds, durations, minlength=3).tolist())
+
+
+def estimate_plot_time(
+    strokes,
+    offset=(0, 0),
+    z_hop=2,
+    feedrate_draw=1800,
+    feedrate_travel=3600,
+    feedrate_z_hop=300,
+    min_lift_distance=0,
+    start_point=(0, 0),
+    acceleration=1000,
+    junction_deviation=0.013,
+):
+    """
+    Estimates the time of plotting strokes with `write_gcode`.
+
+    The moves written by `write_gcode` are generated for all strokes at once and simulated by `simulate_moves`.
+    Start and end gcode, e.g. homing, are not included. Fast enough to compare candidate stroke orders.
+
+    Parameters
+    ----------
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
+        Strokes in plotting order.
+    offset/z_hop/feedrate_draw/feedrate_travel/feedrate_z_hop/min_lift_distance
+        Same as for `write_gcode`.
+    start_point : array_like (2,)
+        Pen position before the first stroke in machine coordinates, i.e. without `offset`, with the pen at z = 0.
+        Defaults to the home position.
+    acceleration/junction_deviation
+        Parameters of the planner, see `simulate_moves`.
+
+    Returns
+    -------
+    PlotTime
+        Estimated time in seconds.
+    """
+    strokes = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    strokes = StrokeBuffer(strokes.coords, strokes.offsets[np.concatenate([[True], strokes.lengths > 0])])
+    if len(strokes) == 0:
+        return PlotTime(0.0, 0.0, 0.0)
+    coords, offsets, lengths = strokes.coords + np.asarray(offset), strokes.offsets, strokes.lengths
+    starts, ends = coords[offsets[:-1]], coords[offsets[1:] - 1]
+    gap = np.zeros(len(strokes), dtype=bool)
+    gap[1:] = np.sqrt(np.sum(np.square(starts[1:] - ends[:-1]), axis=-1)) < min_lift_distance
+
+    # Each stroke starts with a header of pen up, travel and pen down, or a single drawing move across a gap
+    header = np.where(gap, 1, 3)
+    header[0] = 2
+    counts = header + lengths - 1
+    first = np.cumsum(counts) - counts
+    path = np.zeros((np.sum(counts) + 2, 3))
+    feedrate = np.full(len(path) - 1, float(feedrate_draw))
+    kind = np.full(len(path) - 1, _DRAW)
+    path[0, :2] = start_point
+
+    # Row r of path is the target of move r - 1, row 0 is the start
+    lifted = np.flatnonzero(~gap)
+    up = 1 + first[lifted[1:]]
+    path[up, :2], path[up, 2] = ends[lifted[1:] - 1], z_hop
+    travel = 1 + first[lifted] + header[lifted] - 2
+    path[travel, :2], path[travel, 2] = starts[lifted], z_hop
+    down = travel + 1
+    path[down, :2] = starts[lifted]
+    feedrate[up - 1], feedrate[travel - 1], feedrate[down - 1] = feedrate_z_hop, feedrate_travel, feedrate_z_hop
+    kind[up - 1], kind[travel - 1], kind[down - 1] = _LIFT, _TRAVEL, _LIFT
+    bridged = np.flatnonzero(gap)
+    path[1 + first[bridged], :2] = starts[bridged]
+
+    # Drawing moves along all strokes
+    drawn = np.ones(len(coords), dtype=bool)
+    drawn[offsets[:-1]] = False
+    point = np.flatnonzero(drawn)
+    stroke_of = np.repeat(np.arange(len(strokes)), lengths - 1)
+    path[1 + first[stroke_of] + header[stroke_of] + point - offsets[stroke_of] - 1, :2] = coords[point]
+
+    # Final pen up
+    path[-1, :2], path[-1, 2], feedrate[-1], kind[-1] = ends[-1], z_hop, feedrate_z_hop, _LIFT
+
+    return _breakdown(simulate_moves(path, feedrate, acceleration, junction_deviation), kind)
+
+
+_WORD = re.compile(r'([A-Z])\s*([-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+))')
+
+
+def parse_gcode(gcode, arc_segment_length=1, default_feedrate=None):
+    """
+    Extracts the path of the tool from gcode.
+
+    Supports G0/G1 moves, G2/G3 arcs with center offsets, G28 homing, G90/G91 and modal feedrates. Arcs are split into
+    segments like the firmware does. Homing only resets the position, as its duration depends on the machine.
+
+    Parameters
+    ----------
+    gcode : str or iterable of str
+        Text or lines of gcode, e.g. an opened file.
+    arc_segment_length : mm
+        Length of the linear segments of arcs.
+    default_feedrate : mm/min
+        Feedrate of moves before the first F word, e.g. the default of the firmware. By default, such moves raise a
+        ValueError.
+
+    Returns
+    -------
+    path : ndarray (M + 1, 3)
+        Positions visited in order, starting at the origin.
+    feedrates : ndarray (M,)
+        Feedrate of each move in mm/min.
+    """
+    if isinstance(gcode, str):
+        gcode = gcode.splitlines()
+    position = np.zeros(3)
+    path, feedrates = [position], []
+    feedrate, relative = default_feedrate, False
+    for line in gcode:
+        words = dict(_WORD.findall(line.split(';')[0].upper()))
+        if 'F' in words:
+            feedrate = float(words['F'])
+        command = words.get('G')
+        if command is None:
+            continue
+        command = int(float(command))
+        if command in (0, 1, 2, 3) and feedrate is None:
+            raise ValueError("Move without feedrate, set default_feedrate: %s" % line.strip())
+        target = position.copy()
+        for axis, key in enumerate('XYZ'):
+            if key in words:
+                target[axis] = target[axis] + float(words[key]) if relative else float(words[key])
+
+        if command in (0, 1):
+            path.append(target)
+            feedrates.append(feedrate)
+        elif command in (2, 3):
+            center = position[:2] + [float(words.get('I', 0)), float(words.get('J', 0))]
+            start_angle = np.arctan2(*(position[:2] - center)[::-1])
+            sweep = np.arctan2(*(target[:2] - center)[::-1]) - start_angle
+            sweep = sweep % (2 * np.pi) if command == 3 else -(-sweep % (2 * np.pi))
+            if sweep == 0:  # Full circle
+                sweep = 2 * np.pi if command == 3 else -2 * np.pi
+            radius = np.sqrt(np.sum(np.square(position[:2] - center)))
+            n_segments = max(int(np.ceil(abs(sweep) * radius / arc_segment_length)), 1)
+            t = np.arange(1, n_segments + 1) / n_segments
+            angles = start_angle + t * sweep
+            segments = np.empty((n_segments, 3))
+            segments[:, :2] = center + radius * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+            segments[:, 2] = position[2] + t * (target[2] - position[2])
+            segments[-1] = target
+            path.extend(segments)
+            feedrates.extend([feedrate] * n_segments)
+        elif command == 28:
+            homed = [key in words for key in 'XYZ']
+            target = np.where(homed if any(homed) else True, 0, position)
+            path.append(target)
+            feedrates.append(np.inf)
+        elif command == 90:
+            relative = False
+        elif command == 91:
+            relative = True
+        position = target
+    return np.array(path), np.array(feedrates)
+
+
+def estimate_gcode_time(gcode, acceleration=1000, junction_deviation=0.013, default_feedrate=None):
+    """
+    Estimates the time of plotting gcode, e.g. written by `write_gcode`.
+
+    Moves at the lowest height of the program are drawing moves. Other moves with the pen up are travel moves, unless
+    they only change the height, which makes them pen lifts.
+
+    Parameters
+    ----------
+    gcode : str or iterable of str
+        Text or lines of gcode, e.g. an opened file.
+    acceleration/junction_deviation
+        Parameters of the planner, see `simulate_moves`.
+    default_feedrate : mm/min
+        Feedrate of moves before the first F word, see `parse_gcode`.
+
+    Returns
+    -------
+    PlotTime
+        Estimated time in seconds.
+    """
+    path, feedrates = parse_gcode(gcode, default_feedrate=default_feedrate)
+    if len(feedrates) == 0:
+        return PlotTime(0.0, 0.0, 0.0)
+    homing = np.isinf(feedrates)
+    durations = np.zeros(len(feedrates))
+    # Homing stops the machine, so the moves in between are planned independently
+    for moves in np.split(np.arange(len(feedrates)), np.flatnonzero(homing)):
+        moves = moves[~homing[moves]]
+        if len(moves) > 0:
+            durations[moves] = simulate_moves(
+                path[moves[0]:moves[-1] + 2], feedrates[moves[0]:moves[-1] + 1], acceleration, junction_deviation
+            )
+
+    d = np.diff(path, axis=0)
+    drawing = (path[1:, 2] - np.min(path[1:, 2]) <= 1e-6) & (np.abs(d[:, 2]) <= 1e-6)
+    lifting = np.all(np.abs(d[:, :2]) <= 1e-9, axis=-1)
+    kinds = np.where(drawing, _DRAW, np.where(lifting, _LIFT, _TRAVEL))
+    return _breakdown(durations, kinds)
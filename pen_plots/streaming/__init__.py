@@ -0,0 +1,2 @@
+from pen_plots.streaming.sender import GCodeSender, open_serial
+from pen_plots.streaming.emulator import PlotterEmulator
@@ -0,0 +1,103 @@
+"""
+This module contains a plotter emulator on a pseudo-terminal for testing and benchmarking without hardware.
+"""
+import asyncio
+import os
+
+
+class PlotterEmulator():
+    """
+    Emulates the serial interface of a plotter firmware on a pseudo-terminal. Only available on Unix.
+
+    Received bytes are stored in a receive buffer of limited size. Lines are executed one after another, each taking
+    `line_time` seconds, and acknowledged with 'ok' after `latency` seconds. Lines are removed from the receive buffer,
+    once they are executed. Bytes exceeding the receive buffer are counted as overflows, which would be lost by a real
+    firmware.
+
+    Use as asynchronous context manager, which starts and stops the emulation.
+
+    Parameters
+    ----------
+    rx_buffer_size : int
+        Size of the receive buffer in bytes.
+    line_time : float
+        Execution time of each line in seconds.
+    latency : float
+        Delay of acknowledgements in seconds, e.g. caused by the USB-to-serial converter.
+
+    Attributes
+    ----------
+    path : str
+        Path of the pseudo-terminal, see `pen_plots.streaming.open_serial`.
+    lines : list of str
+        Executed lines.
+    overflows : int
+        Number of bytes, which exceeded the receive buffer.
+    """
+
+    def __init__(self, rx_buffer_size=128, line_time=0.0, latency=0.0):
+        self.rx_buffer_size = rx_buffer_size
+        self.line_time = line_time
+        self.latency = latency
+        self.lines = []
+        self.overflows = 0
+        self.path = None
+        self._buffer = bytearray()
+        self._received = asyncio.Event()
+
+    async def __aenter__(self):
+        import tty
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+        os.set_blocking(self._master, False)
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self._master, self._read)
+        self._task = asyncio.ensure_future(self._execute())
+        return self
+
+    async def __aexit__(self, *args):
+        self._task.cancel()
+        asyncio.get_running_loop().remove_reader(self._master)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _read(self):
+        try:
+            data = os.read(self._master, 4096)
+        except OSError:  # No process has opened the pseudo-terminal
+            return
+        self.overflows += max(len(self._buffer) + len(data) - self.rx_buffer_size, 0)
+        self._buffer += data[:max(self.rx_buffer_size - len(self._buffer), 0)]
+        self._received.set()
+
+    async def _execute(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            end = self._buffer.find(b'\n')
+            if end < 0:
+                self._received.clear()
+                await self._received.wait()
+                continue
+            if self.line_time > 0:
+                await asyncio.sleep(self.line_time)
+            line = self._buffer[:end].decode('ascii').strip()
+            del self._buffer[:end + 1]
+            self.lines.append(line)
+            loop.call_later(self.latency, os.write, self._master, b'ok\n')
+
+
+async def _main():
+    async with PlotterEmulator() as emulator:
+        print("Plotter emulator listening on %s" % emulator.path)
+        n_lines = 0
+        while True:
+            await asyncio.sleep(1)
+            if len(emulator.lines) != n_lines:
+                n_lines = len(emulator.lines)
+                print("%d lines received, %d bytes lost" % (n_lines, emulator.overflows))
+
+
+if __name__ == '__main__':
+    asyncio.run(_main())
@@ -0,0 +1,186 @@
+"""
+This module contains an asynchronous sender streaming gcode to a plotter over a serial connection.
+"""
+import asyncio
+import os
+from collections import deque
+
+
+async def open_serial(path, baudrate=115200):
+    """
+    Opens a serial device or pseudo-terminal in raw mode. Only available on Unix.
+
+    Parameters
+    ----------
+    path : str
+        Path of the device, e.g. '/dev/ttyUSB0' or `PlotterEmulator.path`.
+    baudrate : int
+        Baud rate of the connection.
+
+    Returns
+    -------
+    reader : asyncio.StreamReader
+    writer : asyncio.StreamWriter
+    """
+    import termios
+    import tty
+
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    attributes = termios.tcgetattr(fd)
+    attributes[4] = attributes[5] = getattr(termios, 'B%d' % baudrate)
+    termios.tcsetattr(fd, termios.TCSANOW, attributes)
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    read_transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', buffering=0)
+    )
+    transport, protocol = await loop.connect_write_pipe(
+        lambda: _SerialProtocol(read_transport), os.fdopen(os.dup(fd), 'wb', buffering=0)
+    )
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
+
+
+class _SerialProtocol(asyncio.streams.FlowControlMixin):
+    """
+    Protocol of the writing end of a serial connection, which closes the reading end along with it.
+    """
+
+    def __init__(self, read_transport):
+        super().__init__()
+        self._read_transport = read_transport
+
+    def connection_lost(self, exc):
+        super().connection_lost(exc)
+        self._read_transport.close()
+
+
+class GCodeSender():
+    """
+    Streams gcode with character-counting flow control.
+
+    Instead of waiting for the acknowledgement of each line, lines are sent as long as all unacknowledged lines fit
+    into the receive buffer of the firmware. Hence, the firmware always has the next lines at hand and the latency of
+    the connection is hidden. Each line is acknowledged by a response starting with 'ok' or 'error'.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Responses of the firmware.
+    writer : asyncio.StreamWriter
+        Connection to the firmware, see `open_serial`.
+    rx_buffer_size : int
+        Size of the serial receive buffer of the firmware in bytes, e.g. 128 for Grbl and Marlin.
+    progress : callable
+        Called with the number of acknowledged lines and the total number of lines whenever a line is acknowledged.
+    """
+
+    def __init__(self, reader, writer, rx_buffer_size=128, progress=None):
+        self.reader = reader
+        self.writer = writer
+        self.rx_buffer_size = rx_buffer_size
+        self.progress = progress
+        self.errors = []
+        self.n_sent = 0
+        self.n_acknowledged = 0
+        self._pending = deque()  # Unacknowledged lines and their sizes
+        self._buffered = 0
+        self._acknowledged = asyncio.Event()
+        self._running = asyncio.Event()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        """
+        Stops sending further lines. Lines already in the receive buffer of the firmware are still executed.
+        """
+        self._running.clear()
+
+    def resume(self):
+        """
+        Continues sending lines after `pause`.
+        """
+        self._running.set()
+
+    async def send(self, gcode):
+        """
+        Sends gcode and waits until all lines are acknowledged. Comments and empty lines are skipped.
+
+        Parameters
+        ----------
+        gcode : str or iterable of str
+            Text or lines of gcode, e.g. an opened file.
+
+        Returns
+        -------
+        list of tuples
+            Lines answered by an error along with the response.
+
+        Raises
+        ------
+        ValueError
+            when a line doesn't fit into the receive buffer.
+        ConnectionError
+            when the connection is closed before all lines are acknowledged.
+        """
+        if isinstance(gcode, str):
+            gcode = gcode.splitlines()
+        lines = [line.split(';')[0].strip() for line in gcode]
+        lines = [line for line in lines if line]
+        for line in lines:
+            if len(line) + 1 > self.rx_buffer_size:
+                raise ValueError("Line exceeds the receive buffer of %d bytes: %s" % (self.rx_buffer_size, line))
+
+        self.errors, self.n_sent, self.n_acknowledged = [], 0, 0
+        self._total = len(lines)
+        receiver = asyncio.ensure_future(self._receive())
+        try:
+            for line in lines:
+                await self._running.wait()
+                size = len(line) + 1
+                while self._buffered + size > self.rx_buffer_size:
+                    await self._wait_for_acknowledgement(receiver)
+                self._pending.append((line, size))
+                self._buffered += size
+                self.writer.write((line + '\n').encode('ascii'))
+                self.n_sent += 1
+                await self.writer.drain()
+            while self._pending:
+                await self._wait_for_acknowledgement(receiver)
+        finally:
+            receiver.cancel()
+        return self.errors
+
+    async def _wait_for_acknowledgement(self, receiver):
+        self._acknowledged.clear()
+        waiter = asyncio.ensure_future(self._acknowledged.wait())
+        await asyncio.wait([waiter, receiver], return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            waiter.cancel()
+            receiver.result()  # Raises errors of the receiver
+            raise ConnectionError("Connection closed with %d unacknowledged lines" % len(self._pending))
+
+    async def _receive(self):
+        """
+        Reads responses and releases the buffer space of acknowledged lines.
+        """
+        while True:
+            response = await self.reader.readline()
+            if not response:
+                return
+            response = response.decode('ascii', errors='replace').strip()
+            is_error = response.lower().startswith('error')
+            if (response.startswith('ok') or is_error) and self._pending:
+                line, size = self._pending.popleft()
+                self._buffered -= size
+                self.n_acknowledged += 1
+                if is_error:
+                    self.errors.append((line, response))
+                if self.progress is not None:
+                    self.progress(self.n_acknowledged, self._total)
+                self._acknowledged.set()
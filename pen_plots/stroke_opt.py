@@ -1,38 +1,244 @@
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pen_plots.strokes import StrokeBuffer
 
 
-def optimize_stroke_order(strokes, start_point=(0, 0)):
+def optimize_stroke_order(
+    strokes,
+    start_point=(0, 0),
+    local_search=True,
+    time_limit=None,
+    max_iterations=None,
+    n_starts=1,
+    seed=None,
+    max_workers=None,
+    loop_candidates=None,
+    cost_model=None,
+):
     """
-    Optimizes stroke order for plotting to reduce travel distance greedily.
+    Optimizes stroke order for plotting to reduce travel distance.
 
-    May reverse strokes and start closed loops at arbitrary points.
+    Computes a greedy order, which is then improved by local search. May reverse strokes and start closed loops at
+    arbitrary points.
+
+    Parameters
+    ----------
+    strokes : list of strokes or StrokeBuffer
+        Strokes to be ordered. A StrokeBuffer results in a StrokeBuffer.
+    start_point : array_like (2,)
+        Initial pen position.
+    local_search : bool
+        Whether to improve the greedy order by local search, see `agtsp.improve`.
+    time_limit : seconds
+        Time budget of the local search. Defaults to unlimited.
+    max_iterations : int
+        Maximum number of local search rounds. Defaults to unlimited.
+    n_starts : int
+        Number of starts. If greater than one, randomized greedy starts are improved in parallel and the best is kept,
+        see `agtsp.multi_start`. Requires `local_search`.
+    seed : int
+        Seed for randomized starts.
+    max_workers : int
+        Number of worker processes for multiple starts. Defaults to the number of processors.
+    loop_candidates : callable
+        Function returning the indices of the vertices of a closed loop which are considered as entry points during
+        optimization, e.g. `every_kth_vertex`, `arc_length_vertices` or `convex_hull_vertices`. Use
+        `functools.partial` to set parameters. Defaults to all vertices. Either way, the entry point of each loop is
+        refined among all of its vertices once the order is fixed.
+    cost_model : callable
+        Cost of travel moves, e.g. `cost_models.TravelTime` in order to minimize plot time. Defaults to euclidean
+        distance, see `pen_plots.optimization.cost_models`.
     """
-    from pen_plots.optimization.agtsp import greedy
+    from pen_plots.optimization.agtsp import greedy, improve, multi_start
+    from pen_plots.optimization.cost_models import euclidean
+
+    if cost_model is None:
+        cost_model = euclidean
 
     # Transform strokes to a Asymmetric Generalized Traveling Salesman Problem
     tsp = []
+    entries = []  # Candidate entry vertices of closed loops
     for stroke in strokes:
         if np.allclose(stroke[0], stroke[-1]):  # Stroke is closed loop
-            # Stroke may start at any point
-            cities = [(p, p) for p in stroke[:-1]]
-            tsp.append(cities)
+            # Stroke may start at any candidate point
+            candidates = np.arange(len(stroke) - 1) if loop_candidates is None else loop_candidates(stroke)
+            tsp.append([(stroke[i], stroke[i]) for i in candidates])
+            entries.append(candidates)
         else:
-
             cityA = (stroke[0], stroke[-1])
             cityB = (stroke[-1], stroke[0])
             tsp.append([cityA, cityB])
+            entries.append(None)
+
+    if local_search and n_starts > 1:
+        sol = multi_start(
+            tsp,
+            n_starts,
+            start_point,
+            seed=seed,
+            max_workers=max_workers,
+            time_limit=time_limit,
+            max_iterations=max_iterations,
+            cost_model=cost_model,
+        )
+    else:
+        sol = greedy(tsp, start_point, method='grid')
+        if local_search:
+            sol = improve(
+                tsp,
+                sol,
+                start_point,
+                time_limit=time_limit,
+                max_iterations=max_iterations,
+                cost_model=cost_model,
+            )
 
     opt_strokes = []
-    for state_idx, city_idx in greedy(tsp):
+    pos = np.asarray(start_point, dtype=float)
+    for i, (state_idx, city_idx) in enumerate(sol):
         stroke = strokes[state_idx]
-        if np.allclose(stroke[0], stroke[-1]):  # Closed loop
-            if city_idx > 0:  # Shift closed curve accordingly
-                stroke = np.roll(stroke[:-1], -city_idx, axis=0)  # Shift points
+        if entries[state_idx] is not None:  # Closed loop
+            # Refine entry point among all vertices, given the previous and the next stroke
+            entry_costs = cost_model(pos, stroke[:-1])
+            if i + 1 < len(sol):
+                entry_costs += cost_model(stroke[:-1], tsp[sol[i + 1, 0]][sol[i + 1, 1]][0])
+            entry = np.argmin(entry_costs)
+            if entry > 0:  # Shift closed curve accordingly
+                stroke = np.roll(stroke[:-1], -entry, axis=0)  # Shift points
                 stroke = np.concatenate([stroke, stroke[:1]], axis=0)  # Close curve again
         else:
             if city_idx > 0:
                 stroke = stroke[::-1]
 
         opt_strokes.append(stroke)
+        pos = stroke[-1]
+
+    if isinstance(strokes, StrokeBuffer):
+        return StrokeBuffer.from_strokes(opt_strokes)
+    return opt_strokes
+
+
+def _optimize_tiles(args):
+    tiles, start_point, kwargs = args
+    opt_strokes = []
+    for tile_strokes in tiles:
+        opt_strokes += optimize_stroke_order(tile_strokes, start_point, **kwargs)
+        start_point = opt_strokes[-1][-1]  # Next tile starts where the pen stopped
+    return opt_strokes
+
+
+def optimize_stroke_order_tiled(strokes, start_point=(0, 0), strokes_per_tile=500, max_workers=None, **kwargs):
+    """
+    Optimizes stroke order for plotting of large drawings by divide and conquer.
+
+    Strokes are partitioned into square tiles according to the center between their end points. Tiles are visited row
+    by row in alternating direction, so consecutive tiles are adjacent. The order within each tile is optimized by
+    `optimize_stroke_order`, starting at the end point of the previous tile. Rows are optimized independently and in
+    parallel, so the first tile of a row starts at its point closest to the last tile of the previous row instead. As
+    tiles are of limited size, runtime scales linearly with the number of strokes.
+
+    Parameters
+    ----------
+    strokes : list of strokes or StrokeBuffer
+        Strokes to be ordered. A StrokeBuffer results in a StrokeBuffer.
+    start_point : array_like (2,)
+        Initial pen position.
+    strokes_per_tile : int
+        Average number of strokes per tile, which determines the tile size.
+    max_workers : int
+        Number of worker processes. Defaults to the number of processors. For 1, all tiles are optimized one after
+        another in this process, each starting at the end point of the previous tile.
+    kwargs
+        Passed to `optimize_stroke_order`, except for multi-start options.
+
+    Returns
+    -------
+    list of strokes
+        Ordered strokes.
+    """
+    if len(strokes) == 0:
+        return []
+    centers = np.array([(stroke[0] + stroke[-1]) / 2 for stroke in strokes])
 
+    # Determine tile of each stroke
+    origin = np.min(centers, axis=0)
+    extent = np.max(centers, axis=0) - origin
+    tile_size = max(
+        np.sqrt(extent[0] * extent[1] * strokes_per_tile / len(strokes)),
+        np.max(extent) * strokes_per_tile / len(strokes),
+    )
+    if tile_size <= 0:  # All strokes are centered at the same point
+        tile_size = 1
+    cells = np.floor((centers - origin) / tile_size).astype(int)
+    n_cols = np.max(cells[:, 0]) + 1
+    cols = np.where(cells[:, 1] % 2 == 0, cells[:, 0], n_cols - 1 - cells[:, 0])  # Alternate direction per row
+    tile_of = cells[:, 1] * n_cols + cols
+    tiles, tile_of = np.unique(tile_of, return_inverse=True)
+    rows = tiles // n_cols
+
+    # Rows are optimized in parallel tasks, each entered at the point of its first tile closest to the center of the
+    # last tile of the previous row
+    tasks = []
+    prev = np.asarray(start_point, dtype=float)
+    for i, tile in enumerate(tiles):
+        row, col = divmod(tile, n_cols)
+        col = col if row % 2 == 0 else n_cols - 1 - col
+        tile_min = origin + np.array([col, row]) * tile_size
+        tile_strokes = [strokes[j] for j in np.flatnonzero(tile_of == i)]
+        if i == 0:
+            tasks.append(([], prev, kwargs))
+        elif rows[i] != rows[i - 1] and max_workers != 1:
+            tasks.append(([], np.clip(prev, tile_min, tile_min + tile_size), kwargs))
+        tasks[-1][0].append(tile_strokes)
+        prev = tile_min + tile_size / 2
+
+    if max_workers == 1:
+        results = map(_optimize_tiles, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_optimize_tiles, tasks))
+
+    opt_strokes = [stroke for row_strokes in results for stroke in row_strokes]
+    if isinstance(strokes, StrokeBuffer):
+        return StrokeBuffer.from_strokes(opt_strokes)
     return opt_strokes
+
+
+def every_kth_vertex(stroke, k=8):
+    """
+    Entry candidates of a closed loop for `optimize_stroke_order`: Every `k`-th vertex.
+    """
+    return np.arange(0, len(stroke) - 1, k)
+
+
+def arc_length_vertices(stroke, spacing):
+    """
+    Entry candidates of a closed loop for `optimize_stroke_order`: The first vertex after each multiple of `spacing`
+    along the loop.
+    """
+    arc_length = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(stroke[:-1], axis=0), axis=-1))])
+    # The first vertex is always a candidate, even if the loop has no length
+    candidates = np.union1d([0], np.searchsorted(arc_length, np.arange(0, arc_length[-1], spacing)))
+    return candidates[candidates < len(arc_length)]
+
+
+def convex_hull_vertices(stroke):
+    """
+    Entry candidates of a closed loop for `optimize_stroke_order`: The vertices on the convex hull of the loop. Any
+    point outside of the loop is closest to one of these.
+    """
+    points = stroke[:-1]
+    order = np.lexsort((points[:, 1], points[:, 0]))
+
+    def half_hull(indices):
+        hull = []
+        for i in indices:
+            while len(hull) >= 2:
+                a, b = points[hull[-2]], points[hull[-1]]
+                if (b[0] - a[0]) * (points[i][1] - a[1]) - (b[1] - a[1]) * (points[i][0] - a[0]) > 0:
+                    break
+                hull.pop()
+            hull.append(i)
+        return hull
+
+    return np.unique(half_hull(order) + half_hull(order[::-1]))
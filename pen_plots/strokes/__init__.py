@@ -2,9 +2,18 @@
 This module contains basic methods for stroke manipulation.
 
 stroke:  ndarray of points with shape (N, 2) which is intended to be plotted with a continous stroke.
-strokes: List of strokes.
+strokes: List of strokes or StrokeBuffer, which packs all points into a single array. A StrokeGroup additionally
+         defers affine transformations until its points are needed.
 """
 
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
 from pen_plots.strokes.strokes import bounding_box, concat, to_strokes, merge_strokes
-from pen_plots.strokes.transformation import affine_transformation, translate, scale, rotate, scale_to_fit
+from pen_plots.strokes.transformation import affine_matrix, transform, affine_transformation, translate, scale, \
+    rotate, scale_to_fit
+from pen_plots.strokes.simplify import simplify
+from pen_plots.strokes.merge import chain_strokes
+from pen_plots.strokes.overlaps import remove_overlaps
+from pen_plots.strokes.clip import clip
+from pen_plots.strokes.arcs import fit_arcs
 from pen_plots.strokes.shapes import circle, rectangle, rounded_rectangle
@@ -0,0 +1,142 @@
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
+
+
+def _cross(u, v):
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+
+def _circumcenter(a, b, c):
+    """
+    Computes centers of the circles through points `a`, `b` and `c` row by row. Centers of collinear points are not
+    finite.
+    """
+    u, v = a - b, c - b
+    u_squared, v_squared = np.sum(np.square(u), axis=-1), np.sum(np.square(v), axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = 2 * _cross(u, v)
+        return b + np.stack(
+            [v[:, 1] * u_squared - u[:, 1] * v_squared, u[:, 0] * v_squared - v[:, 0] * u_squared], axis=-1
+        ) / d[:, np.newaxis]
+
+
+def _candidate_runs(coords, offsets, tolerance):
+    """
+    Finds runs of consecutive points, whose circumcenters of neighbouring triples agree within `tolerance`.
+
+    Returns
+    -------
+    start, end : ndarray
+        Indices of the first and last point of each run. Consecutive runs overlap by up to two points.
+    """
+    lengths = np.diff(offsets)
+    interior = np.ones(len(coords), dtype=bool)
+    interior[offsets[:-1][lengths > 0]] = False
+    interior[offsets[1:][lengths > 0] - 1] = False
+    i = np.flatnonzero(interior)
+
+    # Circle through each interior point and its neighbours
+    center = np.full((len(coords), 2), np.nan)
+    center[i] = _circumcenter(coords[i - 1], coords[i], coords[i + 1])
+    turn = np.zeros(len(coords))
+    turn[i] = np.sign(_cross(coords[i] - coords[i - 1], coords[i + 1] - coords[i]))
+    valid = np.all(np.isfinite(center), axis=-1) & (turn != 0)
+
+    # Neighbouring triples turning the same way around close centers are linked into runs
+    with np.errstate(invalid='ignore'):
+        linked = valid[:-1] & valid[1:] & (turn[:-1] == turn[1:])
+        linked &= np.sum(np.square(center[1:] - center[:-1]), axis=-1) <= tolerance**2
+    first = np.flatnonzero(valid & ~np.concatenate([[False], linked]))
+    last = np.flatnonzero(valid & ~np.concatenate([linked, [False]]))
+
+    # A run of triples covers their neighbours as well
+    return first - 1, last + 1
+
+
+def fit_arcs(strokes, tolerance=0.01, min_points=4):
+    """
+    Replaces runs of points lying on a circular arc by single arc moves.
+
+    Candidate runs are found by comparing the circumcenters of neighbouring point triples of all strokes at once. Each
+    run is checked against the circle through its first, middle and last point: All points must lie within
+    `tolerance` of the circle, the arc must not deviate more than `tolerance` from any of the original segments
+    (sagitta), all segments must turn the same way and the arc must not exceed a half circle. Runs failing the check
+    are split in half and checked again.
+
+    Parameters
+    ----------
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
+        Strokes to be processed, usually in their final order.
+    tolerance : float
+        Maximum deviation in mm.
+    min_points : int
+        Minimum number of points replaced by an arc. Runs with fewer points are kept as linear moves.
+
+    Returns
+    -------
+    strokes : list of strokes or StrokeBuffer
+        Strokes without the interior points of arcs. A StrokeBuffer is returned if `strokes` is one.
+    arcs : ndarray (P, 3)
+        Arc of the move to each of the P points of `strokes`, given by its center and direction, which is 1 for
+        counter-clockwise arcs (G3), -1 for clockwise arcs (G2) and 0 for linear moves. Pass to `write_gcode`.
+    """
+    buffer = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    coords = buffer.coords.astype(float)
+    accepted = []
+
+    start, end = _candidate_runs(coords, buffer.offsets, tolerance)
+    while True:
+        mask = end - start + 1 >= min_points
+        start, end = start[mask], end[mask]
+        if len(start) == 0:
+            break
+
+        # Points and segments of all runs
+        center = _circumcenter(coords[start], coords[(start + end) // 2], coords[end])
+        counts = end - start + 1
+        run = np.repeat(np.arange(len(start)), counts)
+        first = np.cumsum(counts) - counts
+        point = np.arange(np.sum(counts)) - first[run] + start[run]
+        segment = np.flatnonzero(point[:-1] + 1 == point[1:])
+        segment = segment[run[segment] == run[segment + 1]]
+
+        with np.errstate(invalid='ignore'):
+            radius = np.sqrt(np.sum(np.square(coords[start] - center), axis=-1))
+            u, v = coords[point[segment]] - center[run[segment]], coords[point[segment + 1]] - center[run[segment]]
+            step = np.arctan2(_cross(u, v), np.sum(u * v, axis=-1))
+            direction = np.sign(step[first[:len(start)] - np.arange(len(start))])
+            deviation = np.abs(np.sqrt(np.sum(np.square(coords[point] - center[run]), axis=-1)) - radius[run])
+            chord = np.sum(np.square(coords[point[segment + 1]] - coords[point[segment]]), axis=-1)
+            sagitta = radius[run[segment]] - np.sqrt(np.maximum(np.square(radius[run[segment]]) - chord / 4, 0))
+
+            ok = np.all(np.isfinite(center), axis=-1) & (direction != 0)
+            ok &= np.logical_and.reduceat(deviation <= tolerance, first)
+            ok &= np.bincount(run[segment], sagitta > tolerance, minlength=len(start)) == 0
+            ok &= np.bincount(run[segment], np.sign(step) != direction[run[segment]], minlength=len(start)) == 0
+            ok &= np.abs(np.bincount(run[segment], step, minlength=len(start))) <= np.pi * (1 + 1e-9)
+
+        # Keep accepted runs, split the others at their middle point
+        accepted.append(np.column_stack([start[ok], end[ok], center[ok], direction[ok]]))
+        middle = (start + end) // 2
+        start, end = np.concatenate([start[~ok], middle[~ok]]), np.concatenate([middle[~ok], end[~ok]])
+
+    # Arcs overlapping the previous arc start at its end, their remaining points still lie on the circle
+    accepted = np.concatenate(accepted + [np.zeros((0, 5))])
+    accepted = accepted[np.argsort(accepted[:, 0], kind='stable')]
+    start, end = accepted[:, 0].astype(int), accepted[:, 1].astype(int)
+    start[1:] = np.maximum(start[1:], np.maximum.accumulate(end)[:-1])
+    mask = end - start + 1 >= min_points
+    start, end, accepted = start[mask], end[mask], accepted[mask]
+
+    # Replace interior points of arcs
+    arcs = np.zeros((len(coords), 3))
+    arcs[end] = accepted[:, 2:]
+    keep = np.ones(len(coords), dtype=bool)
+    counts = np.maximum(end - start - 1, 0)
+    keep[np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts - start - 1, counts)] = False
+
+    stroke_of = np.repeat(np.arange(len(buffer)), buffer.lengths)
+    kept_per_stroke = np.bincount(stroke_of[keep], minlength=len(buffer))
+    result = StrokeBuffer(buffer.coords[keep], np.concatenate([[0], np.cumsum(kept_per_stroke)]).astype(int))
+    return (result if isinstance(strokes, StrokeBuffer) else result.to_list()), arcs[keep]
@@ -0,0 +1,77 @@
+"""
+This module contains a packed container for strokes.
+"""
+import numpy as np
+
+
+class StrokeBuffer():
+    """
+    Packed list of strokes. All points are stored in a single contiguous array, strokes are given by offsets into it.
+
+    Behaves like a list of strokes for iteration and indexing, where single strokes are views into the packed points.
+    Functions in `pen_plots.strokes` operate on all points at once when given a StrokeBuffer.
+
+    Parameters
+    ----------
+    coords : ndarray (P, 2)
+        Points of all strokes.
+    offsets : ndarray (N + 1,)
+        Stroke i consists of points `coords[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, coords, offsets):
+        self.coords = np.asarray(coords)
+        self.offsets = np.asarray(offsets, dtype=int)
+
+    @classmethod
+    def from_strokes(cls, strokes):
+        """
+        Packs a list of strokes. Copies all points.
+        """
+        if isinstance(strokes, StrokeBuffer):
+            return strokes
+        lengths = [len(stroke) for stroke in strokes]
+        coords = np.concatenate(strokes, axis=0).astype(float) if len(strokes) > 0 else np.empty((0, 2))
+        return cls(coords, np.concatenate([[0], np.cumsum(lengths)]))
+
+    def to_list(self):
+        """
+        Returns a list of strokes, which are views into the packed points.
+        """
+        return list(self)
+
+    @property
+    def lengths(self):
+        """
+        Number of points of each stroke.
+        """
+        return np.diff(self.offsets)
+
+    def copy(self):
+        return StrokeBuffer(self.coords.copy(), self.offsets.copy())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:  # Contiguous strokes, keep sharing memory
+                stop = max(start, stop)
+                return StrokeBuffer(
+                    self.coords[self.offsets[start]:self.offsets[stop]],
+                    self.offsets[start:stop + 1] - self.offsets[start],
+                )
+            return StrokeBuffer.from_strokes([self[i] for i in range(start, stop, step)])
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("Stroke index out of range")
+        return self.coords[self.offsets[key]:self.offsets[key + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __repr__(self):
+        return 'StrokeBuffer(%d strokes, %d points)' % (len(self), len(self.coords))
@@ -0,0 +1,223 @@
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
+
+# Maximum number of segment/edge pairs processed at once
+_CHUNK_SIZE = 2**20
+
+
+def _cross(u, v):
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+
+def _chunks(n, m):
+    """
+    Yields slices over `n` elements, such that each slice combined with `m` elements stays within the chunk size.
+    """
+    step = max(_CHUNK_SIZE // max(m, 1), 1)
+    for start in range(0, n, step):
+        yield slice(start, min(start + step, n))
+
+
+def _polygon_edges(polygon):
+    """
+    Returns start and end points of the edges of a polygon or a list of polygons, which are closed if necessary.
+    """
+    rings = polygon if isinstance(polygon, list) else [polygon]
+    starts, ends = [], []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        starts.append(ring)
+        ends.append(np.roll(ring, -1, axis=0))
+    return np.concatenate(starts), np.concatenate(ends)
+
+
+def _polygon_intersections(a, b, edge_start, edge_end):
+    """
+    Computes intersections of segments from `a` to `b` with polygon edges.
+
+    Returns
+    -------
+    segment, t : ndarray
+        Segment index and position along the segment of each intersection.
+    """
+    segments, positions = [], []
+    d = edge_end - edge_start
+    for chunk in _chunks(len(a), len(d)):
+        v = (b[chunk] - a[chunk])[:, np.newaxis]
+        w = edge_start[np.newaxis] - a[chunk, np.newaxis]
+        denominator = _cross(v, d[np.newaxis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = _cross(w, d[np.newaxis]) / denominator
+            s = _cross(w, v) / denominator
+        mask = (denominator != 0) & (t > 0) & (t < 1) & (s >= 0) & (s <= 1)
+        i, _ = np.nonzero(mask)
+        segments.append(i + chunk.start)
+        positions.append(t[mask])
+    return np.concatenate(segments), np.concatenate(positions)
+
+
+def _inside_polygon(points, edge_start, edge_end):
+    """
+    Tests points for lying inside of a polygon by the even-odd rule.
+    """
+    inside = np.empty(len(points), dtype=bool)
+    for chunk in _chunks(len(points), len(edge_start)):
+        p = points[chunk, np.newaxis]
+        crosses = (edge_start[:, 1] > p[..., 1]) != (edge_end[:, 1] > p[..., 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (edge_end[:, 0] - edge_start[:, 0]) / (edge_end[:, 1] - edge_start[:, 1])
+            x = edge_start[:, 0] + (p[..., 1] - edge_start[:, 1]) * slope
+        inside[chunk] = np.sum(crosses & (p[..., 0] < x), axis=-1) % 2 == 1
+    return inside
+
+
+def _rectangle_intersections(a, b, rectangles):
+    """
+    Computes intersections of segments from `a` to `b` with the borders of axis-aligned rectangles.
+
+    Returns
+    -------
+    segment, t : ndarray
+        Segment index and position along the segment of each intersection.
+    """
+    segments, positions = [], []
+    for chunk in _chunks(len(a), 4 * len(rectangles)):
+        a_, v = a[chunk, np.newaxis], (b[chunk] - a[chunk])[:, np.newaxis]
+        for axis in range(2):
+            for bound in range(2):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    t = (rectangles[:, bound, axis] - a_[..., axis]) / v[..., axis]
+                    # Intersection must lie within the range of the other axis
+                    other = a_[..., 1 - axis] + t * v[..., 1 - axis]
+                mask = (t > 0) & (t < 1) & (other >= rectangles[:, 0, 1 - axis]) & (other <= rectangles[:, 1, 1 - axis])
+                i, _ = np.nonzero(mask)
+                segments.append(i + chunk.start)
+                positions.append(t[mask])
+    return np.concatenate(segments), np.concatenate(positions)
+
+
+def _inside_rectangles(points, rectangles):
+    """
+    Tests points for lying inside of any of the axis-aligned rectangles.
+    """
+    inside = np.empty(len(points), dtype=bool)
+    for chunk in _chunks(len(points), len(rectangles)):
+        p = points[chunk, np.newaxis]
+        inside[chunk] = np.any(np.all((p >= rectangles[:, 0]) & (p <= rectangles[:, 1]), axis=-1), axis=-1)
+    return inside
+
+
+def clip(strokes, polygon=None, rectangles=None, inside=True):
+    """
+    Clips strokes against a polygon or a set of axis-aligned rectangles.
+
+    Segments of all strokes are split at their intersections with the borders of the area, all at once. Resulting pieces
+    are kept depending on whether their center lies inside the area. Strokes are split where pieces are dropped,
+    whereas closed strokes are joined again where they start and end.
+
+    Parameters
+    ----------
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
+        Strokes to be clipped.
+    polygon : stroke or list of strokes
+        Polygon given by its vertices or a list of polygons combined by the even-odd rule, e.g. an outline with holes.
+    rectangles : array_like (R, 2, 2)
+        Axis-aligned rectangles given by their bounding boxes, see `bounding_box`. Clips against their union. Mutually
+        exclusive with `polygon`.
+    inside : bool
+        Whether to keep the parts inside or outside of the area.
+
+    Returns
+    -------
+    list of strokes or StrokeBuffer
+        Clipped strokes. A StrokeBuffer is returned if `strokes` is one.
+
+    Raises
+    ------
+    ValueError
+        when not exactly one of `polygon` and `rectangles` is given.
+    """
+    if (polygon is None) == (rectangles is None):
+        raise ValueError("Either a polygon or rectangles must be given")
+
+    buffer = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    coords, lengths = buffer.coords.astype(float), buffer.lengths
+    stroke_of = np.repeat(np.arange(len(buffer)), lengths)
+
+    # Segments from point s to point s + 1, single points are kept as segments of length zero
+    last = np.zeros(len(coords), dtype=bool)
+    last[buffer.offsets[1:][lengths > 0] - 1] = True
+    single = last & (lengths[stroke_of] == 1)
+    s = np.flatnonzero(~last | single)
+    a, b = coords[s], coords[s + ~single[s]]
+    if len(s) == 0:
+        return strokes if isinstance(strokes, StrokeBuffer) else []
+
+    # Split segments at intersections with the area
+    if rectangles is not None:
+        rectangles = np.asarray(rectangles, dtype=float).reshape(-1, 2, 2)
+        segment, t = _rectangle_intersections(a, b, rectangles)
+    else:
+        edge_start, edge_end = _polygon_edges(polygon)
+        segment, t = _polygon_intersections(a, b, edge_start, edge_end)
+    segment = np.concatenate([np.arange(len(s)), np.arange(len(s)), segment])
+    t = np.concatenate([np.zeros(len(s)), np.ones(len(s)), t])
+    order = np.lexsort((t, segment))
+    segment, t = segment[order], t[order]
+    distinct = np.concatenate([[True], (np.diff(segment) != 0) | (np.diff(t) > 0)])
+    segment, t = segment[distinct], t[distinct]
+
+    # Pieces between consecutive positions on the same segment, single points remain pieces of length zero
+    piece = np.flatnonzero((segment[:-1] == segment[1:]) | single[s[segment[:-1]]])
+    piece = piece[~single[s[segment[piece]]] | (t[piece] == 0)]
+    piece_segment, t_start = segment[piece], t[piece]
+    t_end = np.where(single[s[piece_segment]], 0, t[np.minimum(piece + 1, len(t) - 1)])
+    v = b[piece_segment] - a[piece_segment]
+    p_start = a[piece_segment] + t_start[:, np.newaxis] * v
+    p_end = a[piece_segment] + t_end[:, np.newaxis] * v
+
+    center = (p_start + p_end) / 2
+    if rectangles is not None:
+        kept = _inside_rectangles(center, rectangles)
+    else:
+        kept = _inside_polygon(center, edge_start, edge_end)
+    if not inside:
+        kept = ~kept
+
+    # Rotate pieces of closed strokes, such that a run of kept pieces wrapping around the closing point stays intact
+    piece_stroke = stroke_of[s[piece_segment]]
+    n_pieces = np.bincount(piece_stroke, minlength=len(buffer))
+    first_piece = np.cumsum(n_pieces) - n_pieces
+    last_piece = first_piece + n_pieces - 1
+    closed = np.zeros(len(buffer), dtype=bool)
+    has_pieces = (n_pieces > 0) & (lengths > 1)
+    closed[has_pieces] = np.all(
+        coords[buffer.offsets[:-1][has_pieces]] == coords[buffer.offsets[1:][has_pieces] - 1], axis=-1
+    )
+    wraps = closed & (n_pieces > 0)
+    wraps[wraps] = kept[first_piece[wraps]] & kept[last_piece[wraps]]
+    # Kept pieces at the beginning of a wrapping stroke are moved behind its last piece
+    n_dropped = np.cumsum(~kept)
+    first_piece_ = np.minimum(first_piece, len(piece) - 1)
+    dropped = n_dropped - np.repeat(n_dropped[first_piece_] - ~kept[first_piece_], n_pieces)
+    key = np.arange(len(piece)) + np.where(wraps[piece_stroke] & (dropped == 0), n_pieces[piece_stroke], 0)
+    k = np.flatnonzero(kept)
+    k = k[np.argsort(key[k], kind='stable')]
+
+    # Reassemble strokes from kept pieces, starting a new stroke wherever the previous piece is missing
+    previous, current = k[:-1], k[1:]
+    start = np.ones(len(k), dtype=bool)
+    continues = (current == previous + 1) & (piece_stroke[current] == piece_stroke[previous])
+    wrapping = (current == first_piece[piece_stroke[current]]) & (previous == last_piece[piece_stroke[previous]])
+    continues |= wrapping & wraps[piece_stroke[current]] & (piece_stroke[current] == piece_stroke[previous])
+    start[1:] = ~continues | single[s[piece_segment[current]]]
+    counts = 1 + start - single[s[piece_segment[k]]]
+    end_position = np.cumsum(counts) - 1
+    points = np.empty((np.sum(counts), 2))
+    points[end_position] = p_end[k]
+    points[end_position[start] - counts[start] + 1] = p_start[k[start]]
+    offsets = np.concatenate([end_position[start] - counts[start] + 1, [len(points)]]).astype(int)
+
+    result = StrokeBuffer(points, offsets)
+    return result if isinstance(strokes, StrokeBuffer) else result.to_list()
@@ -0,0 +1,88 @@
+"""
+This module contains a lazily transformed group of strokes.
+"""
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+
+
+class StrokeGroup():
+    """
+    Strokes with a pending affine transformation.
+
+    Transformations of a group only compose their matrices. Points are transformed once, when the strokes are
+    materialized, e.g. by iteration or indexing. Bounding boxes of axis-aligned transformations are computed from the
+    bounding box of the untransformed points without touching them.
+
+    Parameters
+    ----------
+    strokes : list of strokes or StrokeBuffer
+        Untransformed strokes. Lists are packed into a StrokeBuffer.
+    matrix : array_like (3, 3)
+        Homogeneous transformation matrix, see `pen_plots.strokes.affine_matrix`.
+    """
+
+    def __init__(self, strokes, matrix=np.eye(3)):
+        self.strokes = StrokeBuffer.from_strokes(strokes)
+        self.matrix = np.asarray(matrix, dtype=float)
+        self._bbox = None
+        self._materialized = None
+
+    def transform(self, matrix):
+        """
+        Returns a group with `matrix` applied after the pending transformation. Does not touch any points.
+        """
+        group = StrokeGroup(self.strokes, np.asarray(matrix, dtype=float) @ self.matrix)
+        group._bbox = self._bbox
+        return group
+
+    def bounding_box(self):
+        """
+        Computes the bounding box of the transformed strokes.
+
+        Returns
+        -------
+        ndarray (2, 2)
+            where first dimension is min/max and the second is x/y.
+        """
+        rotation = self.matrix[:2, :2]
+        if np.any(np.count_nonzero(rotation, axis=-1) > 1):  # Rotated bounding box isn't tight
+            coords = self.materialize().coords
+            return np.array([np.min(coords, axis=0), np.max(coords, axis=0)])
+
+        if self._bbox is None:
+            self._bbox = np.array([np.min(self.strokes.coords, axis=0), np.max(self.strokes.coords, axis=0)])
+        corners = self._bbox @ rotation.T + self.matrix[:2, 2]
+        return np.sort(corners, axis=0)
+
+    def materialize(self):
+        """
+        Applies the pending transformation. The result is computed once and shared by subsequent calls.
+
+        Returns
+        -------
+        StrokeBuffer
+            Transformed strokes.
+        """
+        if self._materialized is None:
+            from pen_plots.strokes.transformation import transform
+
+            self._materialized = transform(self.strokes, self.matrix)
+        return self._materialized
+
+    def to_list(self):
+        """
+        Returns a list of the transformed strokes.
+        """
+        return self.materialize().to_list()
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def __getitem__(self, key):
+        return self.materialize()[key]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __repr__(self):
+        return 'StrokeGroup(%d strokes, %d points)' % (len(self), len(self.strokes.coords))
@@ -0,0 +1,130 @@
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
+
+
+def _snap_endpoints(points, tolerance):
+    """
+    Groups points, which are connected by a chain of points closer than `tolerance`, into nodes.
+
+    Points are hashed into a grid with cell size `tolerance`, so close points lie in the same or an adjacent cell.
+
+    Returns
+    -------
+    ndarray (P,)
+        Node index of each point.
+    """
+    cells = np.floor(points / tolerance).astype(np.int64)
+    cells -= np.min(cells, axis=0) - 1  # Leave a margin for neighbouring cells
+    width = np.max(cells[:, 1]) + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # Pairs of close points in the same cell or in one of the following neighbouring cells
+    pairs_a, pairs_b = [], []
+    for dx, dy in [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]:
+        neighbour = keys + dx * width + dy
+        first = np.searchsorted(sorted_keys, neighbour, side='left')
+        counts = np.searchsorted(sorted_keys, neighbour, side='right') - first
+        a = np.repeat(np.arange(len(points)), counts)
+        b = order[np.repeat(first, counts) + np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts)]
+        mask = np.sum(np.square(points[a] - points[b]), axis=-1) <= tolerance**2
+        if dx == 0 and dy == 0:
+            mask &= a < b
+        pairs_a.append(a[mask])
+        pairs_b.append(b[mask])
+    pairs_a, pairs_b = np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+    # Connected components by propagating the smallest point index
+    label = np.arange(len(points))
+    while True:
+        smallest = np.minimum(label[pairs_a], label[pairs_b])
+        updated = label.copy()
+        np.minimum.at(updated, pairs_a, smallest)
+        np.minimum.at(updated, pairs_b, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, label):
+            break
+        label = updated
+
+    return np.unique(label, return_inverse=True)[1]
+
+
+def chain_strokes(strokes, tolerance=1e-6, junctions=False):
+    """
+    Merges strokes sharing endpoints into longer strokes, reversing strokes where necessary.
+
+    Endpoints closer than `tolerance` are considered identical. Strokes are chained through endpoints shared by exactly
+    two strokes, which is the same result as `merge_strokes` without converting to shapely geometries. Runtime is
+    linear in the number of strokes.
+
+    Parameters
+    ----------
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
+        Strokes to be merged.
+    tolerance : float
+        Maximum distance of identical endpoints. Must be positive.
+    junctions : bool
+        Also chain strokes through endpoints shared by more than two strokes by pairing them up. Reduces pen lifts
+        further, but the choice of continuation is arbitrary.
+
+    Returns
+    -------
+    list of strokes or StrokeBuffer
+        Merged strokes. A StrokeBuffer is returned if `strokes` is one.
+    """
+    buffer = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    lengths = buffer.lengths
+    stroke_ids = np.flatnonzero(lengths > 0)
+    N = len(stroke_ids)
+    if N == 0:
+        merged = StrokeBuffer(buffer.coords[:0], np.zeros(1, dtype=int))
+        return merged if isinstance(strokes, StrokeBuffer) else merged.to_list()
+
+    # Ends 2 i and 2 i + 1 are start and end of stroke i
+    first, last = buffer.offsets[stroke_ids], buffer.offsets[stroke_ids + 1] - 1
+    ends = np.stack([buffer.coords[first], buffer.coords[last]], axis=1).reshape(-1, 2)
+    node = _snap_endpoints(ends, tolerance)
+
+    # Pair up ends at each node
+    order = np.argsort(node, kind='stable')
+    degree = np.bincount(node)
+    node_start = np.cumsum(degree) - degree
+    rank = np.arange(2 * N) - node_start[node[order]]
+    paired = (rank % 2 == 0) & (rank + 1 < degree[node[order]])
+    if not junctions:
+        paired &= degree[node[order]] == 2
+    partner = np.full(2 * N, -1)
+    i = np.flatnonzero(paired)
+    partner[order[i]] = order[i + 1]
+    partner[order[i + 1]] = order[i]
+
+    # Walk chains, starting with open chains at unpaired ends and continuing with closed ones
+    sequence = np.empty(N, dtype=int)  # Entry end of each stroke in order of traversal
+    chain_start = np.zeros(N, dtype=bool)
+    visited = np.zeros(N, dtype=bool)
+    n = 0
+    for entry in np.concatenate([np.flatnonzero(partner < 0), 2 * np.arange(N)]):
+        if visited[entry // 2]:
+            continue
+        chain_start[n] = True
+        while entry >= 0 and not visited[entry // 2]:
+            visited[entry // 2] = True
+            sequence[n] = entry
+            n += 1
+            entry = partner[entry ^ 1]
+
+    # Gather points of all chains, dropping the shared point of consecutive strokes
+    stroke, reverse = sequence // 2, sequence % 2 == 1
+    counts = lengths[stroke_ids[stroke]] - ~chain_start
+    t = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(~chain_start, counts)
+    idx = np.where(
+        np.repeat(reverse, counts),
+        np.repeat(last[stroke], counts) - t,
+        np.repeat(first[stroke], counts) + t,
+    )
+    chain_lengths = np.add.reduceat(counts, np.flatnonzero(chain_start))
+
+    merged = StrokeBuffer(buffer.coords[idx], np.concatenate([[0], np.cumsum(chain_lengths)]))
+    return merged if isinstance(strokes, StrokeBuffer) else merged.to_list()
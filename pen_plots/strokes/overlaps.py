@@ -0,0 +1,187 @@
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
+
+
+def _collinear_pairs(p, q, tolerance):
+    """
+    Finds pairs of segments from `p` to `q`, which lie on a common line within `tolerance` and overlap by more than
+    `tolerance`.
+
+    Segments are hashed into fixed buckets of line angle, line offset and position along the line, where long segments
+    are inserted into all position buckets they span. Only segments sharing a bucket or lying in neighbouring buckets
+    are compared, and each such pair is checked individually, so no groups are formed by chaining similar lines.
+    Buckets are sized such that pairs of long segments are always compared, see the reference length below.
+
+    Returns
+    -------
+    i, j : ndarray (K,)
+        Indices of the segments of each pair, where i < j.
+    u : ndarray (S, 2)
+        Direction of each segment. Directions are oriented to a common half-turn of angles, which ends in the largest
+        gap between the angles of paired segments, so segments of a pair point the same way.
+    """
+    v = q - p
+    length = np.sqrt(np.sum(np.square(v), axis=-1))
+    angle = np.arctan2(v[:, 1], v[:, 0]) % np.pi
+    u = np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+    origin = (np.min(np.minimum(p, q), axis=0) + np.max(np.maximum(p, q), axis=0)) / 2
+    center = (p + q) / 2 - origin
+    offset = u[:, 0] * center[:, 1] - u[:, 1] * center[:, 0]
+    position = np.sum(u * center, axis=-1)
+
+    # Collinear segments longer than the reference length differ by less than one angle step. Offsets and positions of
+    # such segments differ by less than the slack, as the distance to the origin amplifies the angle difference. The
+    # reference length keeps the slack below the median length.
+    median_length = np.median(length)
+    radius = np.max(np.sqrt(np.sum(np.square(center), axis=-1)))
+    reference_length = max(median_length, 4 * tolerance * radius / median_length)
+    n_angles = max(int(np.ceil(np.pi / (2 * tolerance / reference_length))), 8)
+    angle_step = np.pi / n_angles
+    slack = 2 * angle_step * radius + tolerance
+    offset_step, position_step = slack, median_length + slack
+    angle_bucket = np.minimum((angle / angle_step).astype(int), n_angles - 1)
+
+    # Lines with an angle close to pi continue at angle 0 in opposite direction
+    wrap = np.flatnonzero(angle_bucket == n_angles - 1)
+    segment = np.concatenate([np.arange(len(p)), wrap])
+    angle_bucket = np.concatenate([angle_bucket, np.full(len(wrap), -1)]).astype(np.int64)
+    offset_bucket = np.floor(np.concatenate([offset, -offset[wrap]]) / offset_step).astype(np.int64)
+    position = np.concatenate([position, -position[wrap]])
+    half_length = length[segment] / 2
+    first_position = np.floor((position - half_length) / position_step).astype(np.int64)
+    n_positions = np.floor((position + half_length) / position_step).astype(np.int64) - first_position + 1
+
+    # Insert segments into all position buckets they span
+    segment, angle_bucket, offset_bucket = [np.repeat(x, n_positions) for x in (segment, angle_bucket, offset_bucket)]
+    ramp = np.arange(len(segment)) - np.repeat(np.cumsum(n_positions) - n_positions, n_positions)
+    position_bucket = np.repeat(first_position, n_positions) + ramp
+    buckets = np.stack([angle_bucket, offset_bucket, position_bucket], axis=-1)
+    buckets -= np.min(buckets, axis=0) - 1
+    shape = np.max(buckets, axis=0) + 2
+    key = (buckets[:, 0] * shape[1] + buckets[:, 1]) * shape[2] + buckets[:, 2]
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+
+    i, j = [], []
+    for neighbour in np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1]), axis=-1).reshape(-1, 3):
+        target = key + (neighbour[0] * shape[1] + neighbour[1]) * shape[2] + neighbour[2]
+        lo, hi = np.searchsorted(sorted_key, target, 'left'), np.searchsorted(sorted_key, target, 'right')
+        counts = hi - lo
+        first = np.repeat(segment, counts)
+        ramp = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = segment[order[np.repeat(lo, counts) + ramp]]
+        compared = first < second
+        i.append(first[compared])
+        j.append(second[compared])
+    pairs = np.unique(np.concatenate(i) * len(p) + np.concatenate(j))
+    i, j = pairs // len(p), pairs % len(p)
+
+    # Both segments must lie on the line of the other one and overlap along it
+    def distance(k, x):
+        d = x - p[k]
+        return np.abs(u[k, 0] * d[:, 1] - u[k, 1] * d[:, 0])
+
+    distances = [distance(i, p[j]), distance(i, q[j]), distance(j, p[i]), distance(j, q[i])]
+    collinear = np.max(distances, axis=0) <= tolerance
+    i, j = i[collinear], j[collinear]
+    t_i = np.sort([np.sum(u[i] * p[i], axis=-1), np.sum(u[i] * q[i], axis=-1)], axis=0)
+    t_j = np.sort([np.sum(u[i] * p[j], axis=-1), np.sum(u[i] * q[j], axis=-1)], axis=0)
+    overlapping = np.minimum(t_i[1], t_j[1]) - np.maximum(t_i[0], t_j[0]) > tolerance
+    i, j = i[overlapping], j[overlapping]
+
+    # Orientations of nearly horizontal lines differ for angles close to 0 and pi. Unless the largest gap between
+    # angles of paired segments already lies there, that cut is moved into it to orient the segments of each line alike
+    paired = np.unique(angle[np.concatenate([i, j])])
+    if len(paired) > 1:
+        gaps = np.diff(paired)
+        if np.max(gaps) > paired[0] + np.pi - paired[-1]:
+            cut = paired[np.argmax(gaps)] + np.max(gaps) / 2
+            angle = (angle - cut) % np.pi + cut - np.pi
+            u = np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+    return i, j, u
+
+
+def remove_overlaps(strokes, tolerance=1e-3):
+    """
+    Removes segments, which are drawn multiple times.
+
+    Pairs of overlapping segments on a common line are found by `_collinear_pairs`. Of each pair, the segment with the
+    smaller start position along the line or, for identical start positions, earlier in the list is kept and the part
+    of the other one covered by it is removed. Strokes are split where segments have been removed or shortened.
+
+    Parameters
+    ----------
+    strokes : list of strokes, StrokeBuffer or StrokeGroup
+        Strokes to be processed.
+    tolerance : float
+        Maximum distance of segments lying on the same line. Overlaps shorter than `tolerance` are ignored.
+
+    Returns
+    -------
+    strokes : list of strokes or StrokeBuffer
+        Strokes without overlapping segments. A StrokeBuffer is returned if `strokes` is one.
+    removed_length : float
+        Total length of removed segments.
+    """
+    buffer = StrokeBuffer.from_strokes(strokes.materialize() if isinstance(strokes, StrokeGroup) else strokes)
+    coords, lengths = buffer.coords, buffer.lengths
+    stroke_of = np.repeat(np.arange(len(buffer)), lengths)
+
+    # Segments from point s to point s + 1, single points are kept as segments of length zero
+    last = np.zeros(len(coords), dtype=bool)
+    last[buffer.offsets[1:][lengths > 0] - 1] = True
+    single = last & (lengths[stroke_of] == 1)
+    s = np.flatnonzero(~last | single)
+    a, b = coords[s], coords[s + ~single[s]]
+    segment_length = np.sqrt(np.sum(np.square(b - a), axis=-1))
+
+    keep = np.ones(len(s), dtype=bool)
+    trim_a, trim_b = np.zeros(len(s), dtype=bool), np.zeros(len(s), dtype=bool)
+    lined = np.flatnonzero(segment_length > 0)
+    if len(lined) > 1:
+        p, q = a[lined], b[lined]
+        i, j, u = _collinear_pairs(p, q, tolerance)
+
+        # Along the direction of the pair, the segment starting first covers the start of the other one
+        start_i = np.minimum(np.sum(u[i] * p[i], axis=-1), np.sum(u[i] * q[i], axis=-1))
+        start_j = np.minimum(np.sum(u[i] * p[j], axis=-1), np.sum(u[i] * q[j], axis=-1))
+        j_first = start_j < start_i
+        first, second = np.where(j_first, j, i), np.where(j_first, i, j)
+
+        # Covered parts as fractions of the covered segment from a to b, which start at a or end at b
+        v = q[second] - p[second]
+        f_p = np.sum((p[first] - p[second]) * v, axis=-1) / np.sum(np.square(v), axis=-1)
+        f_q = np.sum((q[first] - p[second]) * v, axis=-1) / np.sum(np.square(v), axis=-1)
+        from_a = np.sum(v * u[i], axis=-1) >= 0
+        covered_from = np.zeros(len(lined))
+        covered_to = np.ones(len(lined))
+        np.maximum.at(covered_from, second[from_a], np.maximum(f_p, f_q)[from_a])
+        np.minimum.at(covered_to, second[~from_a], np.minimum(f_p, f_q)[~from_a])
+
+        length = segment_length[lined]
+        removed = (covered_to - covered_from) * length <= tolerance
+        trimmed_a = ~removed & (covered_from * length > tolerance)
+        trimmed_b = ~removed & ((1 - covered_to) * length > tolerance)
+        a[lined[trimmed_a]] = (p + covered_from[:, np.newaxis] * (q - p))[trimmed_a]
+        b[lined[trimmed_b]] = (p + covered_to[:, np.newaxis] * (q - p))[trimmed_b]
+        trim_a[lined[trimmed_a]], trim_b[lined[trimmed_b]] = True, True
+        keep[lined[removed]] = False
+
+    removed_length = np.sum(segment_length) - np.sum(np.sqrt(np.sum(np.square(b - a), axis=-1))[keep])
+
+    # Reassemble strokes from kept segments, starting a new stroke wherever the previous segment is missing
+    k = np.flatnonzero(keep)
+    start = np.ones(len(k), dtype=bool)
+    previous, current = s[k[:-1]], s[k[1:]]
+    start[1:] = (current != previous + 1) | (stroke_of[current] != stroke_of[previous])
+    start[1:] |= trim_b[k[:-1]] | trim_a[k[1:]] | single[current] | single[previous]
+    counts = 1 + start - single[s[k]]
+    end_position = np.cumsum(counts) - 1
+    points = np.empty((np.sum(counts), 2))
+    points[end_position] = b[k]
+    points[end_position[start] - counts[start] + 1] = a[k[start]]
+    offsets = np.concatenate([end_position[start] - counts[start] + 1, [len(points)]])
+
+    result = StrokeBuffer(points, offsets)
+    return (result if isinstance(strokes, StrokeBuffer) else result.to_list()), removed_length
@@ -2,13 +2,28 @@
 This module contains functions to create strokes for basic shapes.
 """
 import numpy as np
+from functools import lru_cache
 from pen_plots.strokes.strokes import concat
 
 
+@lru_cache(maxsize=128)
+def _unit_arc(n_segments, start_angle, end_angle):
+    """
+    Computes points of an arc with radius 1. Results are cached and hence read-only.
+    """
+    angles = start_angle + np.arange(n_segments + 1) * ((end_angle - start_angle) / n_segments)
+    points = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    points.flags.writeable = False
+    return points
+
+
 def circle(n_segments, start_angle=0, end_angle=2 * np.pi):
     """
     Constructs a stroke describing a circle or arc with radius 1.
 
+    Points are cached per combination of parameters, so scaled and translated copies of common arcs don't recompute
+    any trigonometric functions.
+
     Parameters
     ----------
     n_segments : int
@@ -21,13 +36,9 @@ def circle(n_segments, start_angle=0, end_angle=2 * np.pi):
     Returns
     -------
     stroke
-        with `n_segments` + 1 points.
+        with `n_segments` + 1 points. The array is read-only, as it is shared by all calls with the same parameters.
     """
-    points = np.empty((n_segments + 1, 2))
-    segment_angle = (end_angle - start_angle) / n_segments
-    for i in range(n_segments + 1):
-        points[i] = [np.cos(start_angle + i * segment_angle), np.sin(start_angle + i * segment_angle)]
-    return points
+    return _unit_arc(int(n_segments), float(start_angle), float(end_angle))
 
 
 def rectangle(width, height):
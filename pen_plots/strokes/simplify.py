@@ -0,0 +1,101 @@
+import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
+
+
+def _segment_distance(points, a, b):
+    """
+    Computes distances of `points` to line segments from `a` to `b` row by row.
+    """
+    ab = b - a
+    length_squared = np.sum(np.square(ab), axis=-1)
+    t = np.sum((points - a) * ab, axis=-1) / np.where(length_squared > 0, length_squared, 1)
+    closest = a + np.clip(t, 0, 1)[:, np.newaxis] * ab
+    return np.sqrt(np.sum(np.square(points - closest), axis=-1))
+
+
+def _simplify_mask(coords, offsets, tolerance):
+    """
+    Computes the points kept by the Ramer-Douglas-Peucker algorithm for packed strokes.
+
+    All segments of all strokes are processed at once. Each iteration splits every segment, whose interior points
+    deviate more than `tolerance` from it, at its farthest point. Hence, the number of iterations is given by the
+    recursion depth and not by the number of strokes.
+
+    Parameters
+    ----------
+    coords : ndarray (P, 2)
+        Points of all strokes.
+    offsets : ndarray (N + 1,)
+        Stroke i consists of points `coords[offsets[i]:offsets[i + 1]]`.
+    tolerance : float
+        Maximum distance of removed points to the simplified stroke.
+
+    Returns
+    -------
+    ndarray (P,)
+        of bools, which is True for kept points.
+    """
+    keep = np.zeros(len(coords), dtype=bool)
+    lengths = np.diff(offsets)
+    keep[offsets[:-1][lengths > 0]] = True
+    keep[offsets[1:][lengths > 0] - 1] = True
+
+    # Segments given by indices of first and last point, which have interior points
+    start, end = offsets[:-1][lengths > 2], offsets[1:][lengths > 2] - 1
+    while len(start) > 0:
+        # Interior points of all segments
+        counts = end - start - 1
+        segment = np.repeat(np.arange(len(start)), counts)
+        first = np.cumsum(counts) - counts
+        interior = np.arange(np.sum(counts)) - first[segment] + start[segment] + 1
+
+        d = _segment_distance(coords[interior], coords[start[segment]], coords[end[segment]])
+
+        # Farthest point of each segment, ties are resolved by the first point
+        max_d = np.maximum.reduceat(d, first)
+        farthest = np.flatnonzero(d == max_d[segment])
+        _, first_farthest = np.unique(segment[farthest], return_index=True)
+        split = interior[farthest[first_farthest]]
+
+        # Split segments, which deviate too much
+        mask = max_d > tolerance
+        start, split, end = start[mask], split[mask], end[mask]
+        keep[split] = True
+        start, end = np.concatenate([start, split]), np.concatenate([split, end])
+        mask = end - start > 1
+        start, end = start[mask], end[mask]
+
+    return keep
+
+
+def simplify(strokes, tolerance):
+    """
+    Simplifies a single stroke or a list of strokes with the Ramer-Douglas-Peucker algorithm.
+
+    Removes points, which deviate at most `tolerance` from the simplified stroke. First and last point of each stroke
+    are always kept, hence closed strokes remain closed.
+
+    Parameters
+    ----------
+    strokes : stroke, list of strokes, StrokeBuffer or StrokeGroup
+        Stroke(s) to be simplified.
+    tolerance : float
+        Maximum deviation in mm.
+
+    Returns
+    -------
+    stroke, list of strokes or StrokeBuffer
+        Simplified strokes.
+    """
+    if isinstance(strokes, StrokeGroup):
+        strokes = strokes.materialize()
+    if isinstance(strokes, StrokeBuffer):
+        keep = _simplify_mask(strokes.coords, strokes.offsets, tolerance)
+        stroke_of = np.repeat(np.arange(len(strokes)), strokes.lengths)
+        kept_per_stroke = np.bincount(stroke_of[keep], minlength=len(strokes))
+        return StrokeBuffer(strokes.coords[keep], np.concatenate([[0], np.cumsum(kept_per_stroke)]))
+    if isinstance(strokes, list):
+        return simplify(StrokeBuffer.from_strokes(strokes), tolerance).to_list()
+    strokes = np.asarray(strokes)
+    return strokes[_simplify_mask(strokes, np.array([0, len(strokes)]), tolerance)]
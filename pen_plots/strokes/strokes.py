@@ -1,4 +1,6 @@
 import numpy as np
+from pen_plots.strokes.buffer import StrokeBuffer
+from pen_plots.strokes.group import StrokeGroup
 
 
 def to_strokes(lines):
@@ -37,6 +39,13 @@ def bounding_box(strokes):
     ndarray (2, 2)
         where first dimension is min/max and the second is x/y.
     """
+    if isinstance(strokes, StrokeGroup):
+        return strokes.bounding_box()
+    if isinstance(strokes, StrokeBuffer):
+        return np.array([
+            np.min(strokes.coords, axis=0),
+            np.max(strokes.coords, axis=0),
+        ])
     if isinstance(strokes, list):
         return np.array(
             [
@@ -53,11 +62,13 @@ def bounding_box(strokes):
 def merge_strokes(strokes):
     """
     Merges strokes where possible.
+
+    See `chain_strokes` for an equivalent, which doesn't convert to shapely geometries and tolerates float noise.
     """
     from shapely.geometry import MultiLineString
     from shapely.ops import linemerge
 
-    merged = linemerge(MultiLineString(strokes))
+    merged = linemerge(MultiLineString(list(strokes)))
     if not hasattr(merged, '__iter__'):  # Result is a single linestring instead of a MultiLineString
         merged = [merged]
 
@@ -1,28 +1,115 @@
 import numpy as np
-from pen_plots.strokes import bounding_box
+from pen_plots.strokes import bounding_box, StrokeBuffer, StrokeGroup
 
 
-def affine_transformation(strokes, rotation=np.eye(2), translation=0):
+def affine_matrix(rotation=np.eye(2), translation=0):
     """
-    Scales a single stroke or a list of strokes by a constant factor.
+    Returns the homogeneous (3, 3) matrix of an affine transformation.
 
     Parameters
     ----------
-    strokes : stroke or list of strokes
-        Stroke(s) to be transformed.
     rotation : array_like (2, 2)
         Rotation matrix.
     translation : scalar or array_like (2,)
         Added constant.
+    """
+    matrix = np.eye(3)
+    matrix[:2, :2] = rotation
+    matrix[:2, 2] = translation
+    return matrix
+
+
+def _packed_coords(strokes):
+    """
+    Returns the array of points if the list of strokes consists of consecutive views covering a single array, e.g. the
+    result of a previous transformation. Returns None otherwise.
+    """
+    if len(strokes) == 0 or not all(isinstance(s, np.ndarray) for s in strokes):
+        return None
+    coords = strokes[0].base
+    if not isinstance(coords, np.ndarray) or coords.ndim != 2 or not coords.flags.c_contiguous:
+        return None
+    if any(s.base is not coords or not s.flags.c_contiguous for s in strokes):
+        return None
+
+    address = np.array([s.__array_interface__['data'][0] for s in strokes])
+    nbytes = np.array([s.nbytes for s in strokes])
+    if address[0] != coords.__array_interface__['data'][0] or np.sum(nbytes) != coords.nbytes:
+        return None
+    if np.any(address[1:] != address[:-1] + nbytes[:-1]):
+        return None
+    return coords
+
+
+def transform(strokes, matrix, inplace=False):
+    """
+    Applies an affine transformation given by a homogeneous matrix to a single stroke or a list of strokes.
+
+    All points are transformed by a single matrix multiplication. A list of strokes is packed into one array and the
+    result is split into views at the original stroke boundaries. A StrokeGroup only composes the matrix with its
+    pending transformation.
+
+    Parameters
+    ----------
+    strokes : stroke, list of strokes, StrokeBuffer or StrokeGroup
+        Stroke(s) to be transformed.
+    matrix : array_like (3, 3)
+        Homogeneous transformation matrix, see `affine_matrix`.
+    inplace : bool
+        Overwrite the points of `strokes` instead of allocating new ones. Requires points of float type.
 
     Returns
     -------
-    stroke or list of strokes
+    stroke, list of strokes, StrokeBuffer or StrokeGroup
         Transformed strokes.
     """
+    matrix = np.asarray(matrix, dtype=float)
+
+    if isinstance(strokes, StrokeGroup):
+        return strokes.transform(matrix)
+
+    if isinstance(strokes, StrokeBuffer):
+        return StrokeBuffer(transform(strokes.coords, matrix, inplace), strokes.offsets)
+
     if isinstance(strokes, list):
-        return [affine_transformation(s, rotation, translation) for s in strokes]
-    return np.einsum('ij,kj->ki', rotation, strokes) + translation
+        if len(strokes) == 0:
+            return []
+        coords = _packed_coords(strokes)
+        if coords is None:
+            if inplace:  # Points are not packed, transform each stroke individually
+                return [transform(s, matrix, inplace=True) for s in strokes]
+            coords, inplace = np.concatenate(strokes, axis=0).astype(float), True
+        coords = transform(coords, matrix, inplace)
+        return np.split(coords, np.cumsum([len(s) for s in strokes[:-1]]))
+
+    strokes = np.asarray(strokes)
+    out = strokes if inplace else None
+    out = np.matmul(strokes, matrix[:2, :2].T, out=out)
+    out += matrix[:2, 2]
+    return out
+
+
+def affine_transformation(strokes, rotation=np.eye(2), translation=0, inplace=False):
+    """
+    Applies an affine transformation to a single stroke or a list of strokes.
+
+    Parameters
+    ----------
+    strokes : stroke, list of strokes, StrokeBuffer or StrokeGroup
+        Stroke(s) to be transformed.
+    rotation : array_like (2, 2)
+        Rotation matrix.
+    translation : scalar or array_like (2,)
+        Added constant.
+    inplace : bool
+        Overwrite the points of `strokes`, see `transform`.
+
+    Returns
+    -------
+    stroke, list of strokes, StrokeBuffer or StrokeGroup
+        Transformed strokes.
+    """
+    return transform(strokes, affine_matrix(rotation, translation), inplace)
 
 
 def rotation_matrix(angle):
@@ -42,34 +129,34 @@ def scaling_matrix(scale_factor):
     return np.eye(2) * scale_factor
 
 
-def translate(strokes, x, y):
+def translate(strokes, x, y, inplace=False):
     """
     Translates a stroke or a list of strokes by `x` and `y`.
 
     See affine_transformation for details.
     """
-    return affine_transformation(strokes, translation=[x, y])
+    return affine_transformation(strokes, translation=[x, y], inplace=inplace)
 
 
-def scale(strokes, scale_factor):
+def scale(strokes, scale_factor, inplace=False):
     """
     Scales a stroke or a list of strokes by `scale_factor`.
 
     See affine_transformation for details.
     """
-    return affine_transformation(strokes, rotation=scaling_matrix(scale_factor))
+    return affine_transformation(strokes, rotation=scaling_matrix(scale_factor), inplace=inplace)
 
 
-def rotate(strokes, angle):
+def rotate(strokes, angle, inplace=False):
     """
     Rotates a stroke or a list of strokes by `angle`.
 
     See affine_transformation for details.
     """
-    return affine_transformation(strokes, rotation=rotation_matrix(angle))
+    return affine_transformation(strokes, rotation=rotation_matrix(angle), inplace=inplace)
 
 
-def scale_to_fit(strokes, min_width=None, max_width=None, min_height=None, max_height=None):
+def scale_to_fit(strokes, min_width=None, max_width=None, min_height=None, max_height=None, inplace=False):
     """
     Returns the scaling matrix corresponding to the given scale_factor.
     """
@@ -88,4 +175,4 @@ def scale_to_fit(strokes, min_width=None, max_width=None, min_height=None, max_h
     elif max_height is not None and height > max_height:
         c[1] = max_height / height
 
-    return affine_transformation(strokes, rotation=np.diag(c))
+    return affine_transformation(strokes, rotation=np.diag(c), inplace=inplace)
@@ -25,3 +25,142 @@ G28 X0 Y0
 """
 
         self.assertEqual(gcode.getvalue(), expected)
+
+    def test_write_gcode_min_lift_distance(self):
+        from pen_plots import write_gcode
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0]]),
+            np.array([[1.0, 0.1], [2.0, 0.1]]),  # Close to previous stroke
+            np.array([[5.0, 0.0], [6.0, 0.0]]),
+        ]
+        gcode = io.StringIO()
+        write_gcode(gcode, strokes, offset=[0, 0], start_gcode=None, end_gcode=None, min_lift_distance=0.5)
+        expected = """G0 F3600 X0.000 Y0.000 Z2.000
+G0 F300 Z0.000
+G0 F1800 X1.000 Y0.000
+G0 F1800 X1.000 Y0.100
+G0 F1800 X2.000 Y0.100
+G0 F300 Z2.000
+G0 F3600 X5.000 Y0.000 Z2.000
+G0 F300 Z0.000
+G0 F1800 X6.000 Y0.000
+G0 F300 Z2.000
+"""
+
+        self.assertEqual(gcode.getvalue(), expected)
+
+    def test_write_gcode_stroke_buffer(self):
+        from pen_plots import write_gcode
+        from pen_plots.strokes import StrokeBuffer
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[3.0, 0.0], [4.0, 0.0]]),
+        ]
+        expected, gcode = io.StringIO(), io.StringIO()
+        write_gcode(expected, strokes, offset=[1, 2])
+        write_gcode(gcode, StrokeBuffer.from_strokes(strokes), offset=[1, 2])
+
+        self.assertEqual(gcode.getvalue(), expected.getvalue())
+
+    def test_write_gcode_chunks(self):
+        import pen_plots.gcode
+        from pen_plots import write_gcode
+
+        strokes = [np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]) + [3 * i, 0] for i in range(10)]
+        expected, gcode = io.StringIO(), io.StringIO()
+        write_gcode(expected, strokes, offset=[1, 2])
+        chunk_size, pen_plots.gcode._CHUNK_SIZE = pen_plots.gcode._CHUNK_SIZE, 4
+        try:
+            write_gcode(gcode, strokes, offset=[1, 2])
+        finally:
+            pen_plots.gcode._CHUNK_SIZE = chunk_size
+
+        self.assertEqual(gcode.getvalue(), expected.getvalue())
+        self.assertEqual(gcode.getvalue().count('Z2.000\n'), 2 * 10)  # Move to and pen up of each stroke
+
+    def test_write_gcode_compact(self):
+        from pen_plots import write_gcode
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [1.0, 1.0]]),  # Repeated point is skipped
+            np.array([[1.0, 1.0], [0.0, 1.0]]),  # Starts at end of previous stroke
+            np.array([[3.0, 0.0], [4.0, 0.5]]),
+        ]
+        gcode = io.StringIO()
+        write_gcode(gcode, strokes, offset=[1, 0], compact=True, precision=1, start_gcode=None, end_gcode='M2')
+        expected = """G0 F3600 X1.0 Y0.0 Z2.0
+G0 F300 Z0.0
+G1 F1800 X2.0
+G1 Y1.0
+G1 X1.0
+G0 F300 Z2.0
+G0 F3600 X4.0 Y0.0
+G0 F300 Z0.0
+G1 F1800 X5.0 Y0.5
+G0 F300 Z2.0
+M2
+"""
+
+        self.assertEqual(gcode.getvalue(), expected)
+
+    def test_write_gcode_relative(self):
+        from pen_plots import write_gcode
+
+        strokes = [
+            np.array([[0.0, 0.0], [0.4, 0.0], [0.8, 0.0], [1.2, 0.0]]),  # Deltas of rounded positions
+            np.array([[3.0, 1.0], [2.0, 1.0]]),
+        ]
+        gcode = io.StringIO()
+        write_gcode(
+            gcode, strokes, offset=[5, 5], compact=True, relative=True, precision=0, start_gcode=None, end_gcode=None
+        )
+        expected = """G0 F3600 X5 Y5 Z2
+G91
+G0 F300 Z-2
+G1 F1800 X1
+G0 F300 Z2
+G0 F3600 X2 Y1
+G0 F300 Z-2
+G1 F1800 X-1
+G0 F300 Z2
+G90
+"""
+
+        self.assertEqual(gcode.getvalue(), expected)
+
+    def test_write_gcode_arcs(self):
+        from pen_plots import write_gcode
+        from pen_plots.strokes import fit_arcs, circle
+
+        strokes, arcs = fit_arcs([np.concatenate([circle(32, 0, np.pi / 2), [[-1.0, 1.0]]])], 0.01)
+        expected = """G0 F3600 X2.000 Y1.000 Z2.000
+G0 F300 Z0.000
+G3 F1800 X1.000 Y2.000 I-1.000 J0.000
+G0 F1800 X0.000 Y2.000
+G0 F300 Z2.000
+"""
+        expected_compact = """G0 F3600 X2 Y1 Z2
+G0 F300 Z0
+G3 F1800 X1 Y2 I-1 J0
+G1 X0
+G0 F300 Z2
+"""
+        gcode, gcode_compact = io.StringIO(), io.StringIO()
+        write_gcode(gcode, strokes, offset=[1, 1], start_gcode=None, end_gcode=None, arcs=arcs)
+        write_gcode(
+            gcode_compact,
+            strokes,
+            offset=[1, 1],
+            start_gcode=None,
+            end_gcode=None,
+            arcs=arcs,
+            compact=True,
+            precision=0
+        )
+
+        self.assertEqual(gcode.getvalue(), expected)
+        self.assertEqual(gcode_compact.getvalue(), expected_compact)
+        with self.assertRaises(ValueError):
+            write_gcode(io.StringIO(), strokes, offset=[1, 1], arcs=arcs[1:])
@@ -19,6 +19,25 @@ class Test_Hershey_Glyphs(unittest.TestCase):
 
         assert_array_almost_equal(glyph.lines, expected)
 
+    def test_compiled_store(self):
+        import tempfile
+        import numpy as np
+        from pathlib import Path
+        import pen_plots.fonts.hershey.hershey as hershey
+
+        glyph = hershey.glyph_by_hershey_code(501)
+
+        # Glyphs are shared views into the packed points
+        self.assertIs(hershey.glyph_by_char('A', font='rowmans'), glyph)
+        self.assertFalse(glyph.lines[0].flags.writeable)
+        with tempfile.TemporaryDirectory() as directory:
+            hershey._compile(Path(directory) / 'hershey')
+            coords = np.load(str(Path(directory) / 'hershey.npy'))
+            with np.load(str(Path(directory) / 'hershey.npz')) as tables:
+                self.assertEqual(tables['line_offsets'][-1], len(coords))
+                self.assertEqual(tables['glyph_offsets'][-1], len(tables['line_offsets']) - 1)
+                self.assertIn('rowmans', tables['fonts'])
+
     def test_get_glyph_space(self):
         import pen_plots.fonts.hershey as hershey
 
@@ -62,6 +81,20 @@ class Test_Glyphs(unittest.TestCase):
 
         assert_array_almost_equal(strokes, expected)
 
+    def test_glyphs_to_strokes_lazy(self):
+        import pen_plots.fonts.hershey as hershey
+        from pen_plots.fonts import glyphs_to_strokes
+        from pen_plots.strokes import StrokeGroup
+
+        glyphs = [hershey.glyph_by_char(c, font='rowmans') for c in 'AI']
+        strokes = glyphs_to_strokes(glyphs, font_size=12, alignment='center')
+        lazy = glyphs_to_strokes(glyphs, font_size=12, alignment='center', lazy=True)
+
+        self.assertIsInstance(lazy, StrokeGroup)
+        self.assertEqual(len(lazy), len(strokes))
+        for i in range(len(strokes)):
+            assert_array_almost_equal(lazy[i], strokes[i])
+
     def test_combine_glyphs(self):
         import pen_plots.fonts.hershey as hershey
         from pen_plots.fonts import combine_glyphs
@@ -86,3 +119,33 @@ class Test_Glyphs(unittest.TestCase):
         self.assertEqual(glyph.left, -1)
         self.assertEqual(glyph.right, 17)
         assert_array_almost_equal(glyph.lines, expected)
+
+    def test_measure_text(self):
+        import pen_plots.fonts.hershey as hershey
+        from pen_plots.fonts import glyphs_to_strokes, measure_text
+        from pen_plots.strokes import bounding_box
+
+        text = 'Flying, first strike (gy)'
+        glyphs = [hershey.glyph_by_char(c, font='rowmans') for c in text]
+        for alignment in ['left', 'right', 'center']:
+            assert_array_almost_equal(
+                measure_text(text, font_size=7, alignment=alignment),
+                bounding_box(glyphs_to_strokes(glyphs, font_size=7, alignment=alignment)),
+            )
+
+    def test_wrap_text(self):
+        import numpy as np
+        from pen_plots.fonts import measure_text, wrap_text
+
+        text = 'When this creature enters, draw a card.'
+        lines = wrap_text(text, 20, font_size=7)
+
+        self.assertEqual(' '.join(lines), text)
+        for i, line in enumerate(lines):
+            width = np.diff(measure_text(line, font_size=7)[:, 0])[0]
+            self.assertLessEqual(width, 20)
+            if i + 1 < len(lines):  # Next word doesn't fit anymore
+                longer = line + ' ' + lines[i + 1].split(' ')[0]
+                self.assertGreater(np.diff(measure_text(longer, font_size=7)[:, 0])[0], 20)
+        self.assertEqual(wrap_text('  a  b ', 0.1), ['a', 'b'])  # Too long words get their own line
+        self.assertEqual(wrap_text(' ', 10), [])
@@ -47,3 +47,95 @@ class Test_Reminders(unittest.TestCase):
         oracle_text = "Flash (You may cast this spell any time you could cast an instant.)\nDeathtouch (Any amount of damage this deals to a creature is enough to destroy it.)"
         expected = "Flash, Deathtouch"
         self.assertEqual(join_keyword_lines(strip_reminders(oracle_text)), expected)
+
+
+class Test_Layout(unittest.TestCase):
+    def test_layout_cache(self):
+        from pen_plots.fonts import glyphs_to_strokes
+        from pen_plots.mtg.glyphs import layout_line, line_to_glyphs
+
+        layout_line.cache_clear()
+        small = layout_line('{2}{R} Cat', font_size=6, alignment='right')
+        large = layout_line('{2}{R} Cat', font_size=12, alignment='right')
+        expected = glyphs_to_strokes(line_to_glyphs('{2}{R} Cat'), font_size=12, alignment='right')
+
+        info = layout_line.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        self.assertIs(small.strokes, large.strokes)
+        self.assertFalse(large.strokes.coords.flags.writeable)
+        self.assertEqual(len(large), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(large[i], expected[i])
+            assert_array_almost_equal(small[i], expected[i] / 2)
+
+    def test_measure_line(self):
+        from pen_plots.mtg.glyphs import layout_line, measure_line, wrap_line
+
+        line = '{T}: Add {C}{C}.'
+        assert_array_almost_equal(
+            measure_line(line, font_size=6, alignment='center'),
+            layout_line(line, font_size=6, alignment='center').bounding_box(),
+        )
+        self.assertEqual(wrap_line(line, 12, font_size=6), ['{T}: Add', '{C}{C}.'])
+
+
+class Test_Card(unittest.TestCase):
+    def test_fit_scale(self):
+        from pen_plots.mtg.card import fit_scale
+
+        self.assertEqual(fit_scale(lambda scale: True), (1.0, 1))
+        scale, iterations = fit_scale(lambda scale: scale <= 0.3, tolerance=0.01)
+        self.assertLessEqual(scale, 0.3)
+        self.assertGreater(scale, 0.29)
+        self.assertEqual(iterations, 1 + 7)
+        with self.assertRaises(ValueError):
+            fit_scale(lambda scale: False)
+
+    def test_oracle_text_fits(self):
+        import numpy as np
+        from unittest import mock
+        from pen_plots.mtg import card
+        from pen_plots.strokes import bounding_box
+
+        oracle_text = 'Flying, vigilance\nWhen this creature enters, draw two cards, then discard a card. ' * 5
+        frame = card.create_card('Cat', 'Creature - Cat', '{1}{W}', '', power='2', toughness='2')
+        text_box_bbox, pt_bar_bbox = bounding_box(frame[6]), bounding_box(frame[5])
+
+        def oracle_text_points(scale=None):
+            with mock.patch.object(card, 'fit_scale', wraps=card.fit_scale) as fit_scale:
+                if scale is not None:
+                    fit_scale.return_value = (scale, 1)
+                strokes = card.create_card('Cat', 'Creature - Cat', '{1}{W}', oracle_text, power='2', toughness='2')
+            return np.concatenate(strokes[len(frame):]), fit_scale
+
+        def fits(points, scale):
+            # Check of each point, as before the binary search
+            inside = np.all((points >= pt_bar_bbox[0]) & (points <= pt_bar_bbox[1]), axis=-1)
+            return np.min(points[:, 1]) > text_box_bbox[0, 1] + scale / 3 and not np.any(inside)
+
+        points, fit_scale = oracle_text_points()
+        fitted = card.fit_scale(*fit_scale.call_args[0])[0]
+        self.assertTrue(fits(points, fitted))
+
+        # Same scale as shrinking the text in steps of 1% until it fits, up to the tolerance of the binary search
+        scale = next(scale for scale in 1 - np.arange(100) / 100 if fits(oracle_text_points(scale)[0], scale))
+        self.assertLess(scale, 1)
+        self.assertGreaterEqual(fitted, scale - 1 / 256)
+        self.assertLess(fitted, scale + 0.01)
+
+    def test_frame_templates(self):
+        import numpy as np
+        from pen_plots.mtg import card
+
+        card._frames.clear()
+        first = card.create_card('Cat', 'Creature - Cat', '{1}{W}', 'Flying', power='2', toughness='2')
+        card.create_card('Dog', 'Creature - Dog', '{G}', 'Trample', power='3', toughness='1')
+        card.create_card('Forest', 'Basic Land - Forest', '', '({T}: Add {G}.)')
+
+        # Frames are built once per variant and copied into each card
+        self.assertEqual(sorted(card._frames, key=str), [8, None])
+        frame = card._frames[8][0]
+        self.assertGreater(len(first), len(frame))
+        for i in range(len(frame)):
+            self.assertFalse(np.shares_memory(first[i], frame.coords))
+            assert_array_almost_equal(first[i], frame[i])
@@ -59,6 +59,38 @@ class Test_Optimization(unittest.TestCase):
 
         assert_array_almost_equal(merge_strokes(strokes), expected)
 
+    def test_chain(self):
+        from pen_plots.strokes import chain_strokes
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 0.0], [0.0, 1.0], [1.0, 1.0 + 1e-9]]),  # Reversed, endpoint differs by float noise
+            np.array([[5.0, 5.0], [6.0, 5.0]]),
+        ]
+        expected = [
+            [[5.0, 5.0], [6.0, 5.0]],
+            [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]],
+        ]
+        merged = chain_strokes(strokes)
+
+        self.assertEqual(len(merged), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(merged[i], expected[i])
+
+    def test_chain_junctions(self):
+        from pen_plots.strokes import chain_strokes
+
+        strokes = [  # Star with three rays
+            np.array([[0.0, 0.0], [1.0, 0.0]]),
+            np.array([[0.0, 0.0], [0.0, 1.0]]),
+            np.array([[0.0, 0.0], [-1.0, 0.0]]),
+        ]
+        self.assertEqual(len(chain_strokes(strokes)), 3)
+
+        merged = chain_strokes(strokes, junctions=True)
+        self.assertEqual(len(merged), 2)
+        self.assertEqual(sum(len(stroke) for stroke in merged), 5)
+
     def test_optimize_order(self):
         from pen_plots import optimize_stroke_order
 
@@ -92,3 +124,240 @@ class Test_Optimization(unittest.TestCase):
         self.assertEqual(len(optimized), len(expected))
         for i in range(len(expected)):
             assert_array_almost_equal(optimized[i], expected[i])
+
+
+class Test_AGTSP(unittest.TestCase):
+    def test_greedy_grid(self):
+        from pen_plots.optimization.agtsp import greedy
+
+        np.random.seed(0)
+        tsp = []
+        for _ in range(200):
+            if np.random.rand() < 0.2:  # Closed loop on integer coordinates to provoke ties
+                points = np.round(np.random.rand(2) * 20 + np.random.rand(np.random.randint(3, 10), 2) * 3)
+                tsp.append([(p, p) for p in points])
+            else:
+                a = np.round(np.random.rand(2) * 20)
+                b = a + np.round(np.random.rand(2) * 3)
+                tsp.append([(a, b), (b, a)])
+
+        np.testing.assert_array_equal(greedy(tsp, method='grid'), greedy(tsp, method='scan'))
+        np.testing.assert_array_equal(greedy(tsp, (30, -5), method='grid'), greedy(tsp, (30, -5), method='scan'))
+
+    def test_grid_boundary(self):
+        from pen_plots.optimization.agtsp import greedy
+        from pen_plots.optimization.spatial import GridIndex
+
+        # 4 / 0.8 rounds to the upper cell border
+        points = np.stack([np.linspace(0, 4, 60), np.linspace(0, 4.8, 60)[::-1]], axis=-1)
+        index = GridIndex(points, cell_size=0.8)
+        self.assertTrue(np.all(index._cell(points) < index.shape))
+
+        tsp = [[(p, p)] for p in points]
+        np.testing.assert_array_equal(greedy(tsp, (4, 0), method='grid'), greedy(tsp, (4, 0), method='scan'))
+
+    def test_grid_fuzz(self):
+        from pen_plots.optimization.spatial import GridIndex, k_nearest
+
+        rng = np.random.RandomState(1)
+        for _ in range(100):
+            points = rng.rand(rng.randint(1, 60), 2) * rng.uniform(0.1, 10, 2)
+            if rng.rand() < 0.3:  # Duplicates provoke ties
+                points = np.round(points)
+            d = np.sum(np.square(points[:, np.newaxis] - points), axis=-1)
+
+            index = GridIndex(points, cell_size=rng.choice([0.1, 0.8, None]))
+            removed = rng.rand(len(points)) < 0.3
+            removed[0] = False
+            index.remove(np.flatnonzero(removed))
+            pos = rng.uniform(-2, 12, 2)
+            distance = np.where(removed, np.inf, np.sum(np.square(points - pos), axis=-1))
+            self.assertEqual(index.nearest(pos), np.argmin(distance))
+
+            k = rng.randint(1, 5)
+            np.fill_diagonal(d, np.inf)
+            expected = np.argsort(d, axis=-1, kind='stable')[:, :k]
+            expected = np.where(np.take_along_axis(d, expected, axis=-1) < np.inf, expected, -1)
+            expected = np.pad(expected, ((0, 0), (0, k - expected.shape[1])), constant_values=-1)
+            np.testing.assert_array_equal(k_nearest(points, k), expected)
+
+    def test_improve(self):
+        from pen_plots.optimization.agtsp import greedy, improve, cost
+
+        np.random.seed(0)
+        tsp = []
+        for _ in range(300):
+            a = np.random.rand(2) * 50
+            b = a + np.random.rand(2) * 5
+            tsp.append([(a, b), (b, a)])
+        tsp.append([(p, p) for p in np.random.rand(20, 2) * 50])  # Closed loop
+
+        sol = greedy(tsp)
+        improved = improve(tsp, sol)
+
+        self.assertEqual(sorted(improved[:, 0]), list(range(len(tsp))))
+        self.assertLess(cost(tsp, improved), cost(tsp, sol) * 0.95)
+
+    def test_improve_reverse(self):
+        from pen_plots.optimization.agtsp import improve
+
+        tsp = [
+            [
+                (np.array([float(i), 0.0]), np.array([i + 1.0, 0.0])),
+                (np.array([i + 1.0, 0.0]), np.array([float(i), 0.0]))
+            ] for i in range(5)
+        ]
+        sol = np.array([[0, 0], [2, 1], [1, 1], [3, 0], [4, 0]])  # Middle section reversed
+
+        np.testing.assert_array_equal(improve(tsp, sol, start_point=(0, 0)), [[i, 0] for i in range(5)])
+
+    def test_cost_batch(self):
+        from pen_plots.optimization.agtsp import cost, flatten, random
+
+        np.random.seed(0)
+        tsp = [[(np.random.rand(2), np.random.rand(2)) for _ in range(np.random.randint(1, 4))] for _ in range(20)]
+        sols = np.stack([random(tsp) for _ in range(5)])
+
+        expected = [
+            sum(
+                np.linalg.norm(tsp[sol[i, 0]][sol[i, 1]][0] - tsp[sol[i - 1, 0]][sol[i - 1, 1]][1])
+                for i in range(1, len(sol))
+            ) for sol in sols
+        ]
+        assert_array_almost_equal(cost(flatten(tsp), sols), expected)
+        self.assertAlmostEqual(cost(tsp, sols[0]), expected[0])
+
+    def test_multi_start(self):
+        from pen_plots.optimization.agtsp import greedy, improve, multi_start, cost
+
+        np.random.seed(0)
+        tsp = []
+        for _ in range(100):
+            a = np.random.rand(2) * 50
+            b = a + np.random.rand(2) * 5
+            tsp.append([(a, b), (b, a)])
+
+        def total_cost(sol):  # Including travel from origin
+            return cost(tsp, sol) + np.linalg.norm(tsp[sol[0, 0]][sol[0, 1]][0])
+
+        sol = multi_start(tsp, n_starts=4, seed=1, max_workers=2)
+        self.assertEqual(sorted(sol[:, 0]), list(range(len(tsp))))
+        self.assertLessEqual(total_cost(sol), total_cost(improve(tsp, greedy(tsp), (0, 0))) + 1e-9)
+        np.testing.assert_array_equal(sol, multi_start(tsp, n_starts=4, seed=1, max_workers=3))
+
+    def test_optimize_order_loop_candidates(self):
+        from functools import partial
+        from pen_plots import optimize_stroke_order
+        from pen_plots.stroke_opt import every_kth_vertex, arc_length_vertices, convex_hull_vertices
+        from pen_plots.strokes import circle
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0]]),
+            circle(64) + [3, 0],  # Closest vertex to (1, 0) is (2, 0)
+        ]
+        for loop_candidates in [
+            partial(every_kth_vertex, k=5),
+            partial(arc_length_vertices, spacing=2),
+            convex_hull_vertices,
+        ]:
+            optimized = optimize_stroke_order(strokes, loop_candidates=loop_candidates)
+            assert_array_almost_equal(optimized[1][0], [2.0, 0.0])
+            assert_array_almost_equal(optimized[1][-1], [2.0, 0.0])
+
+            # Loop of repeated points without length
+            optimized = optimize_stroke_order(strokes + [np.full((4, 2), 5.0)], loop_candidates=loop_candidates)
+            assert_array_almost_equal(optimized[2], np.full((4, 2), 5.0))
+
+    def test_loop_candidates(self):
+        from pen_plots.stroke_opt import every_kth_vertex, arc_length_vertices, convex_hull_vertices
+        from pen_plots.strokes import rectangle
+
+        stroke = np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [2.0, 1.0], [1.0, 0.5], [0.0, 1.0], [0.0, 0.0]])
+
+        np.testing.assert_array_equal(every_kth_vertex(stroke, 2), [0, 2, 4])
+        np.testing.assert_array_equal(arc_length_vertices(rectangle(2, 1), 3), [0, 2])
+        np.testing.assert_array_equal(arc_length_vertices(np.ones((4, 2)), 1), [0])  # Loop without length
+        np.testing.assert_array_equal(convex_hull_vertices(stroke), [0, 2, 3, 5])
+
+    def test_travel_time(self):
+        from pen_plots.optimization.cost_models import TravelTime
+
+        model = TravelTime(feedrate_draw=600, feedrate_travel=1200, feedrate_z_hop=60, z_hop=1, min_lift_distance=0.5)
+
+        assert_array_almost_equal(model(np.zeros((2, 2)), np.array([[0.3, 0.0], [0.0, 2.0]])), [0.03, 2.1])
+
+    def test_optimize_order_travel_time(self):
+        from pen_plots import optimize_stroke_order
+        from pen_plots.optimization.cost_models import TravelTime
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0]]),
+            np.array([[3.0, 0.0], [4.0, 0.0]]),
+            np.array([[1.1, 0.0], [2.9, 0.0]]),
+        ]
+        optimized = optimize_stroke_order(strokes, cost_model=TravelTime(min_lift_distance=0.5))
+
+        assert_array_almost_equal([s[0, 0] for s in optimized], [0.0, 1.1, 3.0])
+
+    def test_optimize_order_tiled(self):
+        from pen_plots.stroke_opt import optimize_stroke_order, optimize_stroke_order_tiled
+
+        np.random.seed(0)
+        strokes = []
+        for _ in range(400):
+            a = np.random.rand(2) * 100
+            strokes.append(np.array([a, a + np.random.rand(2)]))
+
+        def travel(strokes):
+            return sum(np.linalg.norm(strokes[i][0] - strokes[i - 1][-1]) for i in range(1, len(strokes)))
+
+        tiled = optimize_stroke_order_tiled(strokes, strokes_per_tile=50, max_workers=2)
+        self.assertEqual(len(tiled), len(strokes))
+        self.assertEqual(
+            sorted(tuple(np.sort(s, axis=0).ravel()) for s in tiled),
+            sorted(tuple(np.sort(s, axis=0).ravel()) for s in strokes),
+        )
+        self.assertLess(travel(tiled), travel(optimize_stroke_order(strokes, local_search=False)) * 1.1)
+
+    def test_optimize_order_tiled_seams(self):
+        from unittest import mock
+        from pen_plots import stroke_opt
+
+        # Centers on the right border of the last tile, where flooring exceeds the tile count of the extent
+        points = [
+            [0.0, 1.5],
+            [3.0, 2.6999999999999997],
+            [2.6999999999999997, 0.6],
+            [3.5999999999999996, 3.0],
+            [3.5999999999999996, 1.7999999999999998],
+            [2.4, 2.6999999999999997],
+        ]
+        strokes = [np.array([point, point]) for point in points]
+
+        with mock.patch.object(stroke_opt, 'optimize_stroke_order', wraps=stroke_opt.optimize_stroke_order) as tile:
+            tiled = stroke_opt.optimize_stroke_order_tiled(
+                strokes, start_point=(1, 1), strokes_per_tile=1, max_workers=1
+            )
+
+        self.assertEqual(tile.call_count, 5)  # Strokes 1 and 5 share a tile
+        starts = [call[0][1] for call in tile.call_args_list]
+        assert_array_almost_equal(starts[0], [1, 1])
+        # Each tile starts where the previous one ended
+        ends = np.cumsum([len(call[0][0]) for call in tile.call_args_list]) - 1
+        for start, end in zip(starts[1:], ends):
+            assert_array_almost_equal(start, tiled[end][-1])
+
+    def test_optimize_order_stroke_buffer(self):
+        from pen_plots import optimize_stroke_order
+        from pen_plots.strokes import StrokeBuffer
+
+        strokes = StrokeBuffer.from_strokes(
+            [
+                np.array([[1.0, 0.0], [2.0, 0.0]]),
+                np.array([[1.0, 0.0], [0.0, 0.0]]),  # Reversed
+            ]
+        )
+        optimized = optimize_stroke_order(strokes)
+
+        self.assertIsInstance(optimized, StrokeBuffer)
+        assert_array_almost_equal(optimized.coords, [[0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
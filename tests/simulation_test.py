@@ -0,0 +1,74 @@
+import unittest
+import io
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+
+class Test_Simulation(unittest.TestCase):
+    def test_trapezoid(self):
+        from pen_plots.simulation import simulate_moves
+
+        # Accelerates to 100 mm/s within 5 mm, cruises 90 mm and decelerates
+        assert_array_almost_equal(simulate_moves([[0, 0], [100, 0]], [6000], acceleration=1000), [1.1])
+        # Decelerates before reaching the feedrate
+        assert_array_almost_equal(simulate_moves([[0, 0], [1, 0]], [6000], acceleration=1000), [2 * np.sqrt(1e-3)])
+
+    def test_junctions(self):
+        from pen_plots.simulation import simulate_moves
+
+        # Collinear moves don't slow down, sharp corners stop without junction deviation
+        assert_array_almost_equal(simulate_moves([[0, 0], [50, 0], [100, 0]], [6000, 6000], 1000, 0), [0.55, 0.55])
+        assert_array_almost_equal(simulate_moves([[0, 0], [100, 0], [100, 100]], [6000, 6000], 1000, 0), [1.1, 1.1])
+        corner = simulate_moves([[0, 0], [100, 0], [100, 100]], [6000, 6000], 1000, 0.05)
+        self.assertTrue(np.all(corner < 1.1) and np.all(corner > 1.0))
+
+    def test_estimate_plot_time(self):
+        from pen_plots import write_gcode
+        from pen_plots.simulation import estimate_plot_time, estimate_gcode_time
+
+        strokes = [
+            np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0]]),
+            np.array([[10.0, 10.2], [20.0, 10.0]]),
+            np.array([[50.0, 0.0], [60.0, 0.0]]),
+        ]
+        kwargs = dict(offset=[5, 5], min_lift_distance=0.5)
+        estimate = estimate_plot_time(strokes, **kwargs)
+        for compact in [False, True]:
+            gcode = io.StringIO()
+            write_gcode(gcode, strokes, compact=compact, relative=compact, **kwargs)
+            assert_array_almost_equal(estimate_gcode_time(gcode.getvalue()), estimate, decimal=3)
+
+        # Without accelerations, times are given by lengths and feedrates
+        estimate = estimate_plot_time(strokes, acceleration=1e12, junction_deviation=1e12, **kwargs)
+        self.assertAlmostEqual(estimate.draw, (30.0 + np.sqrt(100.04) + 0.2) / 30)
+        self.assertAlmostEqual(estimate.travel, (np.sqrt(5**2 + 5**2 + 2**2) + np.sqrt(30**2 + 10**2)) / 60)
+        self.assertAlmostEqual(estimate.lift, 4 * 2 / 5)
+        self.assertAlmostEqual(estimate.total, estimate.draw + estimate.travel + estimate.lift)
+
+    def test_parse_arcs(self):
+        from pen_plots.simulation import parse_gcode
+
+        path, feedrates = parse_gcode(
+            "G28\nG0 F600 X10 Y0 Z1\nG3 X0 Y10 I-10 J0 ; quarter circle\nG91\nG3 X10 Y-10 I10"
+        )
+
+        self.assertEqual(len(path), len(feedrates) + 1)
+        assert_array_almost_equal(path[-1], [10, 0, 1])
+        assert_array_almost_equal(np.sqrt(np.sum(np.square(path[2:19, :2]), axis=-1)), np.full(17, 10))
+        assert_array_almost_equal(np.sqrt(np.sum(np.square(path[19:, :2] - 10), axis=-1)), np.full(16, 10))
+        # Both arcs are split into segments of at most 1 mm
+        self.assertEqual(len(path), 3 + 2 * 16)
+        np.testing.assert_array_equal(feedrates[1:], 600)
+
+    def test_gcode_without_moves(self):
+        from pen_plots.simulation import estimate_gcode_time, parse_gcode
+
+        for gcode in ["", "; comment only\nG90\nM3"]:
+            self.assertEqual(estimate_gcode_time(gcode), (0.0, 0.0, 0.0))
+
+        # Moves before the first feedrate
+        with self.assertRaises(ValueError):
+            parse_gcode("G0 X10\nG1 F600 X20")
+        path, feedrates = parse_gcode("G0 X10\nG1 F600 X20", default_feedrate=1200)
+        np.testing.assert_array_equal(feedrates, [1200, 600])
+        self.assertAlmostEqual(estimate_gcode_time("G0 X10", 1e12, 1e12, default_feedrate=600).total, 1)
@@ -0,0 +1,58 @@
+import unittest
+import os
+import asyncio
+
+
+@unittest.skipUnless(os.name == 'posix', "Pseudo-terminals require Unix")
+class Test_Streaming(unittest.TestCase):
+    def test_send(self):
+        from pen_plots.streaming import GCodeSender, PlotterEmulator, open_serial
+
+        gcode = "G28 ; Home\n\nG0 X1.000 Y2.000\n" + "G0 F1800 X10.000 Y10.000\n" * 50
+
+        async def send():
+            async with PlotterEmulator(rx_buffer_size=64) as emulator:
+                reader, writer = await open_serial(emulator.path)
+                progress = []
+                sender = GCodeSender(reader, writer, rx_buffer_size=64, progress=lambda *args: progress.append(args))
+                errors = await sender.send(gcode)
+                writer.close()
+                return emulator, progress, errors
+
+        emulator, progress, errors = asyncio.run(send())
+
+        self.assertEqual(emulator.lines, ['G28', 'G0 X1.000 Y2.000'] + ['G0 F1800 X10.000 Y10.000'] * 50)
+        self.assertEqual(emulator.overflows, 0)
+        self.assertEqual(progress[-1], (52, 52))
+        self.assertEqual(errors, [])
+
+    def test_pause(self):
+        from pen_plots.streaming import GCodeSender, PlotterEmulator, open_serial
+
+        async def send():
+            async with PlotterEmulator() as emulator:
+                reader, writer = await open_serial(emulator.path)
+                sender = GCodeSender(reader, writer)
+                sender.pause()
+                task = asyncio.ensure_future(sender.send("G0 X1\nG0 X2\n"))
+                await asyncio.sleep(0.05)
+                n_paused = len(emulator.lines)
+                sender.resume()
+                await task
+                writer.close()
+                return n_paused, emulator.lines
+
+        n_paused, lines = asyncio.run(send())
+
+        self.assertEqual(n_paused, 0)
+        self.assertEqual(lines, ['G0 X1', 'G0 X2'])
+
+    def test_line_too_long(self):
+        from pen_plots.streaming import GCodeSender
+
+        async def send():
+            sender = GCodeSender(asyncio.StreamReader(), None, rx_buffer_size=8)
+            await sender.send("G0 X1.000 Y1.000\n")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(send())
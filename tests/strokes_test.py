@@ -122,6 +122,47 @@ class Test_Transformations(unittest.TestCase):
 
         assert_array_almost_equal(scaled, expected)
 
+    def test_transform_strokes(self):
+        from pen_plots.strokes import transform, affine_matrix
+        from pen_plots.strokes.transformation import rotation_matrix
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 1.0], [0.0, 0.0]]),
+        ]
+        transformed = transform(strokes, affine_matrix(rotation_matrix(np.pi / 2), [1, 2]))
+        expected = [
+            [[1.0, 2.0], [1.0, 3.0], [0.0, 3.0]],
+            [[0.0, 2.0], [1.0, 2.0]],
+        ]
+
+        self.assertEqual(len(transformed), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(transformed[i], expected[i])
+        assert_array_almost_equal(strokes[1], [[0.0, 1.0], [0.0, 0.0]])  # Input unchanged
+        self.assertTrue(np.shares_memory(transformed[0], transformed[1].base))  # Views into packed points
+
+    def test_transform_inplace(self):
+        from pen_plots.strokes import translate, scale, StrokeBuffer
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 1.0], [0.0, 0.0]]),
+        ]
+        # Packed views are transformed in place
+        scaled = scale(translate(strokes, 1, 0), 2, inplace=True)
+        self.assertTrue(np.shares_memory(scaled[0], scaled[1].base))
+        assert_array_almost_equal(scaled[1], [[2.0, 2.0], [2.0, 0.0]])
+
+        # Separate strokes are transformed individually
+        translated = translate(strokes, 1, 0, inplace=True)
+        self.assertIs(translated[0], strokes[0])
+        assert_array_almost_equal(strokes[1], [[1.0, 1.0], [1.0, 0.0]])
+
+        buffer = StrokeBuffer.from_strokes(strokes)
+        translate(buffer, 0, 1, inplace=True)
+        assert_array_almost_equal(buffer[1], [[1.0, 2.0], [1.0, 1.0]])
+
 
 class Test_Shapes(unittest.TestCase):
     def test_circle(self):
@@ -144,6 +185,16 @@ class Test_Shapes(unittest.TestCase):
 
         assert_array_almost_equal(stroke, expected)
 
+    def test_circle_cached(self):
+        from pen_plots.strokes import circle
+
+        stroke = circle(16, np.pi, 2 * np.pi)
+
+        self.assertIs(circle(16, np.pi, 2 * np.pi), stroke)
+        self.assertFalse(stroke.flags.writeable)
+        with self.assertRaises(ValueError):
+            stroke[0] = 0
+
     def test_rectangle(self):
         from pen_plots.strokes import rectangle
 
@@ -152,3 +203,302 @@ class Test_Shapes(unittest.TestCase):
         expected = [[0.0, 0.0], [3.0, 0.0], [3.0, 2.0], [0.0, 2.0], [0.0, 0.0]]
 
         assert_array_almost_equal(stroke, expected)
+
+
+class Test_StrokeBuffer(unittest.TestCase):
+    def test_conversion(self):
+        from pen_plots.strokes import StrokeBuffer
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 1.0], [0.0, 0.0]]),
+        ]
+        buffer = StrokeBuffer.from_strokes(strokes)
+
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.coords.shape, (5, 2))
+        np.testing.assert_array_equal(buffer.offsets, [0, 3, 5])
+        for converted in [buffer.to_list(), list(buffer), [buffer[0], buffer[-1]]]:
+            self.assertEqual(len(converted), len(strokes))
+            for i in range(len(strokes)):
+                assert_array_almost_equal(converted[i], strokes[i])
+
+    def test_views(self):
+        from pen_plots.strokes import StrokeBuffer
+
+        buffer = StrokeBuffer.from_strokes([np.zeros((3, 2)), np.ones((2, 2)), np.zeros((4, 2))])
+
+        self.assertTrue(np.shares_memory(buffer[1], buffer.coords))
+        sliced = buffer[1:]
+        self.assertTrue(np.shares_memory(sliced.coords, buffer.coords))
+        np.testing.assert_array_equal(sliced.lengths, [2, 4])
+        assert_array_almost_equal(sliced[0], np.ones((2, 2)))
+        np.testing.assert_array_equal(buffer[::2].lengths, [3, 4])
+
+    def test_functions(self):
+        from pen_plots.strokes import StrokeBuffer, bounding_box, translate, scale_to_fit
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 1.0], [0.0, 2.0]]),
+        ]
+        buffer = StrokeBuffer.from_strokes(strokes)
+
+        assert_array_almost_equal(bounding_box(buffer), [[0.0, 0.0], [1.0, 2.0]])
+        translated = translate(buffer, 1, 2)
+        self.assertIsInstance(translated, StrokeBuffer)
+        assert_array_almost_equal(translated[1], [[1.0, 3.0], [1.0, 4.0]])
+        assert_array_almost_equal(bounding_box(scale_to_fit(buffer, max_height=1)), [[0.0, 0.0], [1.0, 1.0]])
+
+
+class Test_StrokeGroup(unittest.TestCase):
+    def test_lazy_transformation(self):
+        from pen_plots.strokes import StrokeGroup, translate, scale, scale_to_fit, bounding_box
+
+        strokes = [
+            np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+            np.array([[0.0, 1.0], [0.0, 2.0]]),
+        ]
+        group = translate(scale(StrokeGroup(strokes), 2), 1, 0)
+
+        self.assertIsInstance(group, StrokeGroup)
+        self.assertIsNone(group._materialized)
+        assert_array_almost_equal(bounding_box(group), [[1.0, 0.0], [3.0, 4.0]])
+        self.assertIsNone(group._materialized)  # Bounding box doesn't require transformed points
+
+        group = scale_to_fit(group, max_height=2)
+        expected = [
+            [[1.0, 0.0], [3.0, 0.0], [3.0, 1.0]],
+            [[1.0, 1.0], [1.0, 2.0]],
+        ]
+        self.assertEqual(len(group), len(expected))
+        for i, stroke in enumerate(group):
+            assert_array_almost_equal(stroke, expected[i])
+        assert_array_almost_equal(strokes[1], [[0.0, 1.0], [0.0, 2.0]])  # Input unchanged
+
+    def test_bounding_box_rotated(self):
+        from pen_plots.strokes import StrokeGroup, rotate, bounding_box
+
+        group = rotate(StrokeGroup([np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])]), np.pi / 4)
+
+        assert_array_almost_equal(bounding_box(group), [[0.0, 0.0], [np.sqrt(2) / 2, np.sqrt(2)]])
+
+
+class Test_Simplify(unittest.TestCase):
+    def test_simplify_stroke(self):
+        from pen_plots.strokes import simplify
+
+        stroke = np.array([[0.0, 0.0], [1.0, 0.01], [2.0, 0.0], [2.0, 1.0], [2.05, 1.5], [2.0, 2.0]])
+
+        assert_array_almost_equal(simplify(stroke, 0.1), [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0]])
+        assert_array_almost_equal(simplify(stroke, 0.02), [[0.0, 0.0], [2.0, 0.0], [2.0, 1.0], [2.05, 1.5], [2.0, 2.0]])
+
+    def test_simplify_closed(self):
+        from pen_plots.strokes import simplify, circle
+
+        simplified = simplify(circle(64), 0.05)
+
+        self.assertLess(len(simplified), 64)
+        assert_array_almost_equal(simplified[0], simplified[-1])
+        # Remaining points of the circle deviate less than the tolerance
+        angle = 2 * np.pi / (len(simplified) - 1)
+        self.assertLess(1 - np.cos(angle / 2), 0.05)
+
+    def test_simplify_strokes(self):
+        from pen_plots.strokes import simplify, StrokeBuffer
+
+        strokes = [
+            np.array([[0.0, 0.0], [0.5, 0.0], [1.0, 0.0]]),
+            np.array([[3.0, 3.0]]),
+            np.array([[0.0, 1.0], [1.0, 1.0], [1.0, 2.0]]),
+        ]
+        expected = [
+            [[0.0, 0.0], [1.0, 0.0]],
+            [[3.0, 3.0]],
+            [[0.0, 1.0], [1.0, 1.0], [1.0, 2.0]],
+        ]
+        for simplified in [simplify(strokes, 0.1), simplify(StrokeBuffer.from_strokes(strokes), 0.1)]:
+            self.assertEqual(len(simplified), len(expected))
+            for i in range(len(expected)):
+                assert_array_almost_equal(simplified[i], expected[i])
+
+
+class Test_Overlaps(unittest.TestCase):
+    def test_shared_edge(self):
+        from pen_plots.strokes import remove_overlaps, rectangle, translate
+
+        strokes, removed_length = remove_overlaps([rectangle(1, 1), translate(rectangle(1, 1), 1, 0)])
+        expected = [
+            [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]],
+            [[1.0, 0.0], [2.0, 0.0], [2.0, 1.0], [1.0, 1.0]],
+        ]
+
+        self.assertAlmostEqual(removed_length, 1)
+        self.assertEqual(len(strokes), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(strokes[i], expected[i])
+
+    def test_partial_overlap(self):
+        from pen_plots.strokes import remove_overlaps, StrokeBuffer
+
+        strokes = StrokeBuffer.from_strokes(
+            [
+                np.array([[0.0, 0.0], [2.0, 0.0]]),
+                np.array([[3.0, 1e-6], [1.0, 0.0], [1.0, 1.0]]),  # Reversed and slightly off
+                np.array([[5.0, 5.0]]),
+                np.array([[2.0, 0.0], [0.5, 0.0]]),  # Fully covered
+            ]
+        )
+        strokes, removed_length = remove_overlaps(strokes)
+        expected = [
+            [[0.0, 0.0], [2.0, 0.0]],
+            [[3.0, 0.0], [2.0, 0.0]],
+            [[1.0, 0.0], [1.0, 1.0]],
+            [[5.0, 5.0]],
+        ]
+
+        self.assertIsInstance(strokes, StrokeBuffer)
+        self.assertAlmostEqual(removed_length, 2.5)
+        self.assertEqual(len(strokes), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(strokes[i], expected[i], decimal=5)
+
+    def test_dense_segments(self):
+        from pen_plots.strokes import remove_overlaps
+
+        # Short segments at random angles, which don't overlap, but lie on similar lines
+        rng = np.random.default_rng(0)
+        p = rng.uniform(0, 100, (20000, 2))
+        angle = rng.uniform(0, np.pi, len(p))
+        q = p + rng.uniform(0.05, 0.5, (len(p), 1)) * np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+        strokes, removed_length = remove_overlaps([np.array([a, b]) for a, b in zip(p, q)])
+
+        self.assertEqual(removed_length, 0)
+        self.assertEqual(len(strokes), len(p))
+        self.assertAlmostEqual(
+            sum(np.sum(np.sqrt(np.sum(np.square(np.diff(stroke, axis=0)), axis=-1))) for stroke in strokes),
+            np.sum(np.sqrt(np.sum(np.square(q - p), axis=-1))),
+        )
+
+    def test_subdivided_line(self):
+        from pen_plots.strokes import remove_overlaps
+
+        x = np.linspace(0, 100, 10001)
+        line = np.stack([x, np.zeros_like(x)], axis=-1)
+        strokes, removed_length = remove_overlaps([line, line[::-1].copy(), np.array([[10.0, 0.0], [90.0, 0.0]])])
+
+        self.assertAlmostEqual(removed_length, 180)
+        self.assertAlmostEqual(sum(np.sum(np.abs(np.diff(stroke[:, 0]))) for stroke in strokes), 100)
+
+    def test_opposite_directions(self):
+        from pen_plots.strokes import remove_overlaps
+
+        def covered_length(strokes):
+            # Length of the union of the x intervals of all segments
+            x = np.sort(np.concatenate([np.stack([stroke[:-1, 0], stroke[1:, 0]], axis=-1) for stroke in strokes]))
+            x = x[np.argsort(x[:, 0])]
+            ends = np.maximum.accumulate(x[:, 1])
+            previous_ends = np.concatenate([[-np.inf], ends[:-1]])
+            return np.sum(np.maximum(ends - np.maximum(x[:, 0], previous_ends), 0))
+
+        strokes = [
+            np.array([[-1.0, 0.0], [36.0, 0.0]]),
+            np.array([[36.0, 0.0], [-0.5, 1e-5]]),
+            np.array([[17.0, 0.0], [-22.0, 1e-5]]),
+        ]
+        result, removed_length = remove_overlaps(strokes)
+        self.assertAlmostEqual(removed_length, 54.5)
+        self.assertAlmostEqual(covered_length(result), 58)
+
+        # Segments on a line in both directions with noise below the tolerance, at angles close to 0 and pi
+        rng = np.random.default_rng(0)
+        x = np.sort(rng.uniform(0, 100, (200, 2)), axis=-1)
+        x = np.where(rng.random((len(x), 1)) < 0.5, x, x[:, ::-1])
+        strokes = [np.stack([a, rng.normal(0, 1e-4, 2)], axis=-1) for a in x]
+        result, removed_length = remove_overlaps(strokes)
+        self.assertGreater(removed_length, 0)
+        self.assertAlmostEqual(covered_length(result), covered_length(strokes), places=6)
+
+
+class Test_Clip(unittest.TestCase):
+    def test_clip_polygon(self):
+        from pen_plots.strokes import clip, rectangle, translate
+
+        strokes = [
+            np.array([[-1.0, 0.5], [0.5, 0.5], [0.5, 2.0]]),
+            np.array([[2.0, 2.0]]),
+            np.array([[0.25, 0.25]]),
+        ]
+        area = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+
+        inside = clip(strokes, area)
+        expected = [[[0.0, 0.5], [0.5, 0.5], [0.5, 1.0]], [[0.25, 0.25]]]
+        self.assertEqual(len(inside), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(inside[i], expected[i])
+
+        outside = clip(strokes, area, inside=False)
+        expected = [[[-1.0, 0.5], [0.0, 0.5]], [[0.5, 1.0], [0.5, 2.0]], [[2.0, 2.0]]]
+        self.assertEqual(len(outside), len(expected))
+        for i in range(len(expected)):
+            assert_array_almost_equal(outside[i], expected[i])
+
+        # Closed strokes remain connected at their start
+        outside = clip([rectangle(2, 2)], translate(rectangle(1, 1), 1.5, -0.5), inside=False)
+        expected = [[[2.0, 0.5], [2.0, 2.0], [0.0, 2.0], [0.0, 0.0], [1.5, 0.0]]]
+        self.assertEqual(len(outside), len(expected))
+        assert_array_almost_equal(outside[0], expected[0])
+
+    def test_clip_rectangles(self):
+        from pen_plots.strokes import clip, StrokeBuffer
+
+        strokes = StrokeBuffer.from_strokes([np.array([[0.0, 0.5], [5.0, 0.5]])])
+        rectangles = [[[1.0, 0.0], [2.0, 1.0]], [[1.5, 0.0], [3.0, 1.0]], [[4.0, 0.0], [6.0, 1.0]]]
+
+        inside = clip(strokes, rectangles=rectangles)
+        self.assertIsInstance(inside, StrokeBuffer)
+        self.assertEqual(len(inside), 2)
+        assert_array_almost_equal(
+            inside.coords, [[1.0, 0.5], [1.5, 0.5], [2.0, 0.5], [3.0, 0.5], [4.0, 0.5], [5.0, 0.5]]
+        )
+
+        outside = clip(strokes, rectangles=rectangles, inside=False)
+        self.assertEqual(len(outside), 2)
+        assert_array_almost_equal(outside.coords, [[0.0, 0.5], [1.0, 0.5], [3.0, 0.5], [4.0, 0.5]])
+
+
+class Test_Arcs(unittest.TestCase):
+    def test_fit_circle(self):
+        from pen_plots.strokes import fit_arcs, circle
+
+        strokes, arcs = fit_arcs([circle(64) * 5 + [10, 10]], 0.01)
+
+        # Full circles are split into half circles
+        assert_array_almost_equal(strokes[0], [[15, 10], [5, 10], [15, 10]])
+        assert_array_almost_equal(arcs, [[0, 0, 0], [10, 10, 1], [10, 10, 1]])
+
+    def test_fit_rounded_rectangle(self):
+        from pen_plots.strokes import fit_arcs, rounded_rectangle
+
+        stroke = rounded_rectangle(20, 10, 2, 16)[::-1]
+        strokes, arcs = fit_arcs([stroke], 0.01)
+
+        # Each corner is replaced by a clockwise arc, straight edges are kept
+        self.assertEqual(len(strokes[0]), 9)
+        self.assertEqual(np.count_nonzero(arcs[:, 2] == -1), 4)
+        self.assertEqual(np.count_nonzero(arcs[:, 2] == 0), 5)
+        assert_array_almost_equal(
+            np.unique(np.round(arcs[arcs[:, 2] != 0, :2], 6), axis=0), [[2, 2], [2, 8], [18, 2], [18, 8]]
+        )
+
+    def test_fit_tolerance(self):
+        from pen_plots.strokes import fit_arcs, circle, StrokeBuffer
+
+        # Segments of a coarse circle deviate more than the tolerance from the arc
+        strokes = StrokeBuffer.from_strokes([circle(8, 0, np.pi) * 10, np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0]])])
+        fitted, arcs = fit_arcs(strokes, 0.01)
+
+        self.assertIsInstance(fitted, StrokeBuffer)
+        assert_array_almost_equal(fitted.coords, strokes.coords)
+        self.assertFalse(np.any(arcs[:, 2]))
+        self.assertEqual(np.count_nonzero(fit_arcs(strokes, 1)[1][:, 2]), 1)